@@ -0,0 +1,57 @@
+from __future__ import annotations
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bench.synthetic_raw import RUN_DATE, generate
+from src import transform
+
+# load_raw_folder: serial pandas path vs decode worker processes, with and
+# without orjson, on a synthetic JSON page set (default 1M rows in 200 pages).
+# The frames must come out identical whatever the worker count. The
+# threshold in transform.POOL_MIN_PAGES comes from runs of this script at
+# small page counts.
+#
+#   python -m bench.bench_load_raw_folder [raw_dir] [n_rows]
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+def time_load(folder: Path, workers: int) -> tuple[pd.DataFrame, float]:
+    start = time.perf_counter()
+    df = transform.load_raw_folder(folder, workers = workers)
+    return df, time.perf_counter() - start
+
+def main(raw_dir: Path, n_rows: int = 1_000_000) -> None:
+    folder = raw_dir / 'cms_partd' / RUN_DATE
+    if not folder.exists():
+        generate(raw_dir, n_partd = n_rows, n_provider = 10, page_size = 5_000)
+
+    print('CPUs:', os.cpu_count())
+    orjson = transform.orjson
+    baseline = None
+
+    for workers in WORKER_COUNTS:
+        for use_orjson in ([True, False] if workers > 1 else [True]):
+            transform.orjson = orjson if use_orjson else None
+            df, seconds = time_load(folder, workers)
+
+            label = f'{workers} worker(s)' + ('' if workers == 1 else ', orjson' if use_orjson else ', stdlib json')
+            print(f'{label:<26} {seconds:6.1f}s  {len(df) / seconds / 1e3:,.0f}k rows/s')
+
+            if baseline is None:
+                baseline = df
+            else:
+                pd.testing.assert_frame_equal(df, baseline)
+
+    transform.orjson = orjson
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(Path(sys.argv[1]), *(int(n) for n in sys.argv[2:3]))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            main(Path(tmp))
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.build_mart import (
+    SKETCH_COLS,
+    add_sketches,
+    build_mart_drug_year,
+    build_mart_prescriber_drug_year,
+    build_mart_prescriber_year,
+)
+from src.schema import apply_schema
+from src.sketch import compare_exact_approx, estimate, rollup_estimate
+
+# Exact vs HyperLogLog distinct counts on fixed synthetic clean data (two
+# years, zipf-distributed drugs): the mean relative error of the per-year
+# marts and of the all-years rollup must stay within the standard error.
+# A year built without sketches must roll up without failing. Run by
+# `make check_sketches`: an error above the bound exits non-zero.
+#
+#   python -m bench.bench_sketches [rows_per_year]
+
+YEARS = (2022, 2023)
+N_PRESCRIBERS = 200_000
+N_DRUGS = 3_000
+
+def synthetic_clean(rows_per_year: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    drugs = np.array([f'DRUG{i}' for i in range(N_DRUGS)])
+
+    frames = [
+        pd.DataFrame({
+            'Prscrbr_NPI': rng.integers(1_000_000_000, 1_000_000_000 + N_PRESCRIBERS, rows_per_year),
+            'Gnrc_Name': drugs[rng.zipf(1.3, rows_per_year) % N_DRUGS],
+            'Tot_Clms': rng.integers(11, 500, rows_per_year),
+            'Tot_Drug_Cst': rng.random(rows_per_year) * 1000,
+            'year': year,
+        })
+        for year in YEARS
+    ]
+
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+def check(name: str, report: dict) -> None:
+    print(f'{name}: {report}')
+    # raised, not asserted, so the gate still holds under python -O
+    if report['mean_rel_error'] > report['standard_error']:
+        raise AssertionError(f'{name}: estimates outside the HLL error bound')
+
+def main(rows_per_year: int = 500_000) -> None:
+    df = synthetic_clean(rows_per_year)
+
+    base = build_mart_prescriber_drug_year(df)
+    prescriber_year = build_mart_prescriber_year(base)
+    drug_year = build_mart_drug_year(base)
+
+    start = time.perf_counter()
+    prescriber_year, drug_year = add_sketches(base, prescriber_year, drug_year)
+    print(f'sketches built in {time.perf_counter() - start:.2f}s')
+
+    for mart, (sketch_col, count_col) in (
+        (prescriber_year, SKETCH_COLS['prescriber_year']),
+        (drug_year, SKETCH_COLS['drug_year']),
+    ):
+        check(sketch_col, compare_exact_approx(mart[count_col], estimate(mart[sketch_col])))
+
+    # distinct prescribers per drug over all years, from the sketches alone
+    exact = base.groupby('generic_name', observed=True)['npi'].nunique()
+    rollup = rollup_estimate(drug_year, ['generic_name'], 'distinct_prescriber_sketch', 'n').set_index('generic_name')
+    check('all-years rollup', compare_exact_approx(exact, rollup['n'].loc[exact.index].array))
+
+    # the latest year appended without sketches (sketches=False): its rows add
+    # nothing, drugs seen only that year keep a missing estimate
+    partial = drug_year.copy()
+    partial.loc[partial['year'] == YEARS[-1], 'distinct_prescriber_sketch'] = None
+    rollup = rollup_estimate(partial, ['generic_name'], 'distinct_prescriber_sketch', 'n')
+
+    assert len(rollup) == partial['generic_name'].nunique()
+    print(f'rollup with a sketch-less year: {len(rollup):,} drugs, {int(rollup["n"].isna().sum())} without an estimate')
+
+if __name__ == '__main__':
+    main(*(int(n) for n in sys.argv[1:2]))
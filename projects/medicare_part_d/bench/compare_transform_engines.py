@@ -0,0 +1,63 @@
+from __future__ import annotations
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from bench.synthetic_raw import RUN_DATE, generate
+from src import transform
+
+# transform.run_pipeline with the pandas and the DuckDB join engine on the same
+# synthetic pages: both must write the same Parquet column types and, read
+# back, the same frame.
+#
+#   python -m bench.compare_transform_engines [n_rows]
+
+def run_engine(engine: str, work_dir: Path) -> tuple[Path, float]:
+    start = time.perf_counter()
+    output_path = transform.run_pipeline(RUN_DATE, engine = engine)
+    seconds = time.perf_counter() - start
+
+    # both engines write the same file name
+    kept_path = work_dir / f'{engine}.parquet'
+    shutil.copyfile(output_path, kept_path)
+
+    return kept_path, seconds
+
+def main(n_rows: int = 200_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        generate(work_dir / 'raw', n_partd = n_rows, page_size = 5_000)
+
+        # the pipeline reads and writes under its module-level directories
+        transform.RAW_DIR = work_dir / 'raw'
+        transform.CLEAN_DIR = work_dir / 'clean'
+        transform.CLEAN_DIR.mkdir()
+
+        outputs = {}
+        for engine in transform.JOIN_ENGINES:
+            outputs[engine], seconds = run_engine(engine, work_dir)
+            print(f'{engine}: {seconds:.2f}s')
+
+        schemas = {engine: pq.read_schema(path) for engine, path in outputs.items()}
+        pandas_types = {f.name: f.type for f in schemas['pandas']}
+        duckdb_types = {f.name: f.type for f in schemas['duckdb']}
+
+        diff = {
+            name: (pandas_types.get(name), duckdb_types.get(name))
+            for name in pandas_types.keys() | duckdb_types.keys()
+            if pandas_types.get(name) != duckdb_types.get(name)
+        }
+        assert not diff, f'Column types differ (pandas, duckdb): {diff}'
+
+        frames = {engine: pd.read_parquet(path) for engine, path in outputs.items()}
+        pd.testing.assert_frame_equal(frames['pandas'], frames['duckdb'])
+
+        print(f'{n_rows:,} rows: identical column types and values')
+
+if __name__ == '__main__':
+    main(*(int(n) for n in sys.argv[1:2]))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import json
+import random
+import sys
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.dq_checks import PARTD_REQUIRED_COLS
+
+# Synthetic CMS Data API dumps for the benchmarks: page_NNNNN.json (or
+# .parquet) files laid out like the ingesters write them, under
+# <raw_dir>/cms_partd/<run_date> and <raw_dir>/cms_provider/<run_date>.
+# Every value is text, as the API returns it; numeric fields hold whole
+# counts, dollar amounts or suppressed (blank) counts.
+#
+#   python -m bench.synthetic_raw <raw_dir> [n_partd] [page_size] [json|parquet]
+
+RUN_DATE = '2026-02-01'
+
+# value kinds of the Part D numeric columns: whole counts, dollar amounts and
+# counts that may be suppressed
+INTEGER_COLS = ['Tot_Clms', 'Tot_30day_Fills', 'Tot_Day_Suply', 'Tot_Benes', 'GE65_Tot_Clms']
+DECIMAL_COLS = ['Tot_Drug_Cst', 'GE65_Tot_Drug_Cst']
+SUPPRESSIBLE_COLS = ['GE65_Tot_30day_Fills', 'GE65_Tot_Day_Suply', 'GE65_Tot_Benes']
+
+def partd_rows(n_rows: int, npis: list[str], rng: random.Random) -> list[dict]:
+    drugs = [f'DRUG{i}' for i in range(300)]
+    rows = []
+
+    for _ in range(n_rows):
+        row = {col: rng.choice(['A', 'B', 'C', '']) for col in PARTD_REQUIRED_COLS}
+        row['Prscrbr_NPI'] = rng.choice(npis)
+        row['Gnrc_Name'] = rng.choice(drugs)
+        row['Prscrbr_State_Abrvtn'] = rng.choice(['CA', 'NY', 'TX'])
+
+        for col in INTEGER_COLS:
+            row[col] = str(rng.randint(11, 500))
+
+        for col in DECIMAL_COLS:
+            row[col] = f'{rng.random() * 1000:.2f}'
+
+        # GE65 counts under 11 beneficiaries are suppressed (left blank)
+        for col in SUPPRESSIBLE_COLS:
+            row[col] = rng.choice(['', str(rng.randint(11, 500))])
+
+        rows.append(row)
+
+    return rows
+
+def provider_rows(npis: list[str], rng: random.Random) -> list[dict]:
+    return [
+        {
+            'Rndrng_NPI': npi,
+            'Tot_Srvcs': str(rng.randint(1, 99)),
+            'Tot_Benes': str(rng.randint(1, 99)),
+            'Tot_Mdcr_Pymt_Amt': f'{rng.random() * 99:.2f}',
+            'Tot_Mdcr_Alowd_Amt': f'{rng.random() * 99:.2f}',
+            'Rndrng_Prvdr_Crdntls': rng.choice(['MD', 'DO']),
+        }
+        for npi in npis
+    ]
+
+def write_pages(rows: list[dict], folder: Path, page_size: int, fmt: str = 'json') -> None:
+    folder.mkdir(parents = True, exist_ok = True)
+
+    for k in range(0, len(rows), page_size):
+        page = rows[k:k + page_size]
+        name = f'page_{k // page_size + 1:05d}'
+
+        if fmt == 'json':
+            (folder / f'{name}.json').write_text(json.dumps(page))
+        else:
+            schema = pa.schema([(col, pa.string()) for col in page[0]])
+            pq.write_table(pa.Table.from_pylist(page, schema = schema), folder / f'{name}.parquet')
+
+def generate(
+    raw_dir: Path,
+    n_partd: int = 20_000,
+    n_provider: int = 3_000,
+    page_size: int = 1_000,
+    fmt: str = 'json',
+    run_date: str = RUN_DATE,
+    seed: int = 0
+) -> Path:
+    rng = random.Random(seed)
+
+    # some prescribers have no provider row, so the left join leaves gaps
+    npis = [str(1_000_000_000 + i * 7) for i in range(n_provider + 500)]
+
+    write_pages(partd_rows(n_partd, npis, rng), raw_dir / 'cms_partd' / run_date, page_size, fmt)
+    write_pages(provider_rows(npis[:n_provider], rng), raw_dir / 'cms_provider' / run_date, page_size, fmt)
+
+    return raw_dir
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    raw_dir = Path(args[0])
+    n_partd = int(args[1]) if len(args) > 1 else 20_000
+    page_size = int(args[2]) if len(args) > 2 else 1_000
+    fmt = args[3] if len(args) > 3 else 'json'
+
+    generate(raw_dir, n_partd = n_partd, page_size = page_size, fmt = fmt)
+    print(f'Synthetic pages written under: {raw_dir}')
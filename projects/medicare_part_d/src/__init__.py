@@ -1 +1,10 @@
-import src
\ No newline at end of file
+import src
+import sys
+from pathlib import Path
+
+# the repo root, so the shared utils package imports as utils.<module> when
+# the project runs as python -m src.<module> from projects/medicare_part_d
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
@@ -1,6 +1,11 @@
 from pathlib import Path
+import argparse
 import pandas as pd
 
+from src.schema import apply_schema
+from src.sketch import HLL_PRECISION, build_sketches, compare_exact_approx, estimate
+from utils.mart_writer import read_mart, write_mart
+
 
 def get_project_paths(run_date):
 
@@ -12,9 +17,9 @@ def get_project_paths(run_date):
 
     return {
         'clean_path': clean_dir / f'medicare_partd_provider_clean_{run_date}.parquet',
-        'base_mart_path': mart_dir / f'mart_prescriber_drug_year_{run_date}.parquet',
-        'prescriber_year_mart_path': mart_dir / f'mart_prescriber_year_{run_date}.parquet',
-        'drug_year_mart_path': mart_dir / f'mart_drug_year_{run_date}.parquet',
+        'base_mart_path': mart_dir / f'mart_prescriber_drug_year_{run_date}',
+        'prescriber_year_mart_path': mart_dir / f'mart_prescriber_year_{run_date}',
+        'drug_year_mart_path': mart_dir / f'mart_drug_year_{run_date}',
         'mart_dir': mart_dir,
     }
 
@@ -22,7 +27,7 @@ def build_mart_prescriber_drug_year(df):
 
     mart = (
         df
-        .groupby(['Prscrbr_NPI', 'Gnrc_Name', 'year'], as_index=False)
+        .groupby(['Prscrbr_NPI', 'Gnrc_Name', 'year'], as_index=False, observed=True)
         .agg(
             total_claim_count=('Tot_Clms', 'sum'),
             total_drug_cost=('Tot_Drug_Cst', 'sum'),
@@ -33,24 +38,23 @@ def build_mart_prescriber_drug_year(df):
         })
     )
 
-    assert not mart.duplicated(
-        subset=['npi', 'generic_name', 'year']
-    ).any(), 'Duplicate rows found in mart_prescriber_drug_year'
-
-    assert (mart['total_claim_count'] >= 0).all()
-    assert (mart['total_drug_cost'] >= 0).all()
+    # the groupby makes (npi, generic_name, year) unique and drops null keys,
+    # so no duplicated() pass over the mart; only the measures are checked
+    assert (mart[['total_claim_count', 'total_drug_cost']] >= 0).all().all()
 
     return mart
 
 def build_mart_prescriber_year(df_base):
 
+    # the base grain is unique per (npi, generic_name, year), so the distinct
+    # drugs of a prescriber-year are its rows: a size, not a nunique hash pass
     mart = (
         df_base
-        .groupby(['npi', 'year'], as_index=False)
+        .groupby(['npi', 'year'], as_index=False, observed=True)
         .agg(
             total_claim_count=('total_claim_count', 'sum'),
             total_drug_cost=('total_drug_cost', 'sum'),
-            distinct_drug_count=('generic_name', 'nunique'),
+            distinct_drug_count=('generic_name', 'size'),
         )
         .sort_values('total_drug_cost', ascending=False)
         .reset_index(drop=True)
@@ -60,46 +64,212 @@ def build_mart_prescriber_year(df_base):
 
 def build_mart_drug_year(df_base):
 
+    # distinct prescribers of a drug-year are its base rows, as above
     mart = (
         df_base
-        .groupby(['generic_name', 'year'], as_index=False)
+        .groupby(['generic_name', 'year'], as_index=False, observed=True)
         .agg(
             total_claim_count=('total_claim_count', 'sum'),
             total_drug_cost=('total_drug_cost', 'sum'),
-            distinct_prescriber_count=('npi', 'nunique'),
+            distinct_prescriber_count=('npi', 'size'),
         )
         .sort_values('total_drug_cost', ascending=False)
         .reset_index(drop=True)
     )
 
-    assert not mart.duplicated(
-        subset=['generic_name', 'year']
-    ).any(), 'Duplicate rows found in mart_drug_year'
-
     return mart
 
-def main():
-    run_date = '2026-02-01'
+# the only clean columns the marts read: the clean file carries the whole
+# merged prescriber and provider record, none of which the marts need
+MART_INPUT_COLS = ['Prscrbr_NPI', 'Gnrc_Name', 'Tot_Clms', 'Tot_Drug_Cst']
+
+def read_clean(clean_path, year):
+    # typed on load as well, for clean files written before the schema layer
+    df = apply_schema(pd.read_parquet(clean_path, columns=MART_INPUT_COLS))
+    df['year'] = year
+
+    return df
+
+SKETCH_COLS = {
+    'prescriber_year': ('distinct_drug_sketch', 'distinct_drug_count'),
+    'drug_year': ('distinct_prescriber_sketch', 'distinct_prescriber_count'),
+}
+
+def add_sketches(base_mart, prescriber_year_mart, drug_year_mart, p=HLL_PRECISION):
+    # mergeable HyperLogLog sketches next to the exact counts, so distinct
+    # counts over several years or coarser grains need only the coarse marts
+    drug_sketches = build_sketches(base_mart, ['npi', 'year'], 'generic_name', p)
+    prescriber_sketches = build_sketches(base_mart, ['generic_name', 'year'], 'npi', p)
+
+    prescriber_year_mart = prescriber_year_mart.merge(
+        drug_sketches.rename(columns={'sketch': 'distinct_drug_sketch'}),
+        on=['npi', 'year'], how='left',
+    )
+
+    drug_year_mart = drug_year_mart.merge(
+        prescriber_sketches.rename(columns={'sketch': 'distinct_prescriber_sketch'}),
+        on=['generic_name', 'year'], how='left',
+    )
+
+    for mart, (sketch_col, count_col) in (
+        (prescriber_year_mart, SKETCH_COLS['prescriber_year']),
+        (drug_year_mart, SKETCH_COLS['drug_year']),
+    ):
+        # logged only: the error bound is statistical, so it is checked by
+        # bench/bench_sketches.py on fixed synthetic data, not on every build
+        report = compare_exact_approx(mart[count_col], estimate(mart[sketch_col]), p)
+        print(f'{sketch_col}: {report}')
+
+    return prescriber_year_mart, drug_year_mart
+
+def replace_year_partitions(existing, delta):
+    # a clean snapshot covers whole years, so every (npi, generic_name, year)
+    # key of those years is either in the delta or gone; other years are kept
+    kept = existing[~existing['year'].isin(delta['year'].unique())]
+    merged = pd.concat([kept, delta], ignore_index=True)
+
+    # concat of categoricals with different categories falls back to strings
+    return apply_schema(merged)
+
+def swap_year_partitions(previous_marts, base_delta, prescriber_year_delta, drug_year_delta):
+    # a partition swap, not a per-key update: the run's year is rebuilt in
+    # full from its clean snapshot and replaces that year in the previous
+    # marts, whose other years are carried over as they are
+    base_mart = replace_year_partitions(previous_marts['base'], base_delta)
+
+    # the coarser marts only re-aggregate the delta years, then swap them in
+    prescriber_year_mart = (
+        replace_year_partitions(previous_marts['prescriber_year'], prescriber_year_delta)
+        .sort_values('total_drug_cost', ascending=False)
+        .reset_index(drop=True)
+    )
+
+    drug_year_mart = (
+        replace_year_partitions(previous_marts['drug_year'], drug_year_delta)
+        .sort_values('total_drug_cost', ascending=False)
+        .reset_index(drop=True)
+    )
+
+    return base_mart, prescriber_year_mart, drug_year_mart
 
+def load_previous_marts(previous_run_date):
+    paths = get_project_paths(previous_run_date)
+
+    mart_paths = {
+        'base': paths['base_mart_path'],
+        'prescriber_year': paths['prescriber_year_mart_path'],
+        'drug_year': paths['drug_year_mart_path'],
+    }
+
+    if not all(path.exists() for path in mart_paths.values()):
+        return None
+
+    return {
+        name: apply_schema(read_mart(path))
+        for name, path in mart_paths.items()
+    }
+
+def sketched(marts):
+    # True when every row of both coarse marts carries its sketch, False when
+    # neither has a sketch column; anything in between is a mixed build
+    present = [
+        marts[name][sketch_col].notna().all() if sketch_col in marts[name] else None
+        for name, (sketch_col, _) in SKETCH_COLS.items()
+    ]
+
+    if all(present):
+        return True
+    if all(p is None for p in present):
+        return False
+    return None
+
+def backfill_sketches(marts):
+    # sketches of every year from the previous base mart, replacing missing or
+    # partial sketch columns, so no older partition is left without them
+    for name, (sketch_col, _) in SKETCH_COLS.items():
+        marts[name] = marts[name].drop(columns=[sketch_col], errors='ignore')
+
+    marts['prescriber_year'], marts['drug_year'] = add_sketches(
+        marts['base'], marts['prescriber_year'], marts['drug_year']
+    )
+
+    return marts
+
+def main(run_date='2026-02-01', year=2023, previous_run_date=None, sketches=False):
     paths = get_project_paths(run_date)
 
-    df_clean = pd.read_parquet(paths['clean_path'])
-    df_clean['year'] = 2023
+    df_clean = read_clean(paths['clean_path'], year)
 
-    base_mart = build_mart_prescriber_drug_year(df_clean)
+    base_delta = build_mart_prescriber_drug_year(df_clean)
+    prescriber_year_delta = build_mart_prescriber_year(base_delta)
+    drug_year_delta = build_mart_drug_year(base_delta)
 
+    if sketches:
+        prescriber_year_delta, drug_year_delta = add_sketches(
+            base_delta, prescriber_year_delta, drug_year_delta
+        )
+
+    previous_marts = None
+    if previous_run_date is not None:
+        previous_marts = load_previous_marts(previous_run_date)
+
+        if previous_marts is None:
+            print(f'No marts found for {previous_run_date}, running a full build')
+
+        elif sketches and not sketched(previous_marts):
+            print(f'Marts from {previous_run_date} lack sketches for some rows, backfilling them')
+            previous_marts = backfill_sketches(previous_marts)
+
+        elif not sketches and sketched(previous_marts) is not False:
+            # the swapped-in year would have no sketches, and estimates over
+            # the marts would fail on it
+            raise ValueError(
+                f'Marts from {previous_run_date} carry sketches: rebuild with sketches=True, '
+                f'or without previous_run_date for a full build without them'
+            )
+
+    if previous_marts is not None:
+        print(f'Partition swap: rebuilding year {year} over the marts from {previous_run_date}')
+        base_mart, prescriber_year_mart, drug_year_mart = swap_year_partitions(
+            previous_marts, base_delta, prescriber_year_delta, drug_year_delta
+        )
+    else:
+        base_mart = base_delta
+        prescriber_year_mart = prescriber_year_delta
+        drug_year_mart = drug_year_delta
+
+    # one hive partition per year, each sorted by the key analyses filter on
     paths['mart_dir'].mkdir(parents=True, exist_ok=True)
-    base_mart.to_parquet(paths['base_mart_path'], index=False)
 
-    prescriber_year_mart = build_mart_prescriber_year(base_mart)
-    prescriber_year_mart.to_parquet(
-        paths['prescriber_year_mart_path'], index=False
+    write_mart(
+        base_mart, paths['base_mart_path'],
+        partition_cols=['year'], sort_by=['npi', 'generic_name'],
+    )
+
+    write_mart(
+        prescriber_year_mart, paths['prescriber_year_mart_path'],
+        partition_cols=['year'], sort_by=['npi'],
     )
 
-    drug_year_mart = build_mart_drug_year(base_mart)
-    drug_year_mart.to_parquet(
-        paths['drug_year_mart_path'], index=False
+    write_mart(
+        drug_year_mart, paths['drug_year_mart_path'],
+        partition_cols=['year'], sort_by=['generic_name'],
     )
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Build the marts from a clean snapshot.')
+    parser.add_argument('--run-date', default='2026-02-01')
+    parser.add_argument('--year', type=int, default=2023)
+    parser.add_argument(
+        '--previous-run-date',
+        help='swap the year into the marts of this run date instead of a full build',
+    )
+    parser.add_argument('--sketches', action='store_true', help='add HyperLogLog distinct-count sketches')
+    args = parser.parse_args()
+
+    main(
+        run_date=args.run_date,
+        year=args.year,
+        previous_run_date=args.previous_run_date,
+        sketches=args.sketches,
+    )
\ No newline at end of file
@@ -1,5 +1,95 @@
 from __future__ import annotations
 import pandas as pd
+import pyarrow.compute as pc
+
+from utils.numeric import NUMERIC_PATTERN, parse_numeric, to_arrow_strings
+
+# ========== RULE ENGINE ==========
+
+# 10 digits, optionally surrounded by whitespace or carrying a float-style '.0'
+# suffix from an upstream numeric cast
+NPI_PATTERN = r'^\s*\d{10}\s*$|^\s*\d{10}\.0$'
+
+def check_numeric(
+    df: pd.DataFrame,
+    col: str,
+    empty_as_missing: bool = True
+) -> tuple[dict, pd.Series]:
+    s = df[col]
+
+    # Arrow kernels (or a per-distinct-value lookup) instead of pd.to_numeric;
+    # already numeric columns are returned as they are
+    coerced, invalid = parse_numeric(s, empty_as_missing = empty_as_missing)
+    bad_count = int(invalid.sum())
+
+    examples = []
+    if bad_count > 0:
+        examples = list(pd.unique(s[invalid].astype('string').str.strip())[:10])
+
+    return {'rule': 'numeric', 'column': col, 'bad_count': bad_count, 'examples': examples}, coerced
+
+def check_npi(df: pd.DataFrame, col: str) -> list[dict]:
+    s = df[col]
+
+    if pd.api.types.is_integer_dtype(s):
+        valid = s.between(1_000_000_000, 9_999_999_999)
+        null_count = int(s.isna().sum())
+        bad_count = int((~valid.fillna(False)).sum()) - null_count
+    else:
+        arr = to_arrow_strings(s)
+        null_count = arr.null_count
+        matched = pc.match_substring_regex(arr, NPI_PATTERN)
+        bad_count = len(arr) - null_count - pc.sum(matched, min_count = 0).as_py()
+
+    return [
+        {'rule': 'not_null', 'column': col, 'bad_count': null_count, 'examples': []},
+        {'rule': 'npi_format', 'column': col, 'bad_count': int(bad_count), 'examples': []},
+    ]
+
+def check_null_rate(df: pd.DataFrame, col: str, max_rate: float) -> dict:
+    null_rate = float(df[col].isna().mean()) if len(df) else 0.0
+    return {
+        'rule': 'max_null_rate',
+        'column': col,
+        'bad_count': int(null_rate > max_rate),
+        'null_rate': null_rate,
+        'max_rate': max_rate,
+        'examples': [],
+    }
+
+def evaluate_rules(df: pd.DataFrame, rules: dict) -> dict:
+    # rules: {'required': [...], 'numeric': [...], 'npi': [...], 'max_null_rate': {col: rate},
+    #         'empty_as_missing': bool}
+    report = {'rows': len(df), 'checks': [], 'failures': [], 'coerced': {}}
+
+    missing = [c for c in rules.get('required', []) if c not in df.columns]
+    report['checks'].append({
+        'rule': 'required', 'column': None, 'bad_count': len(missing), 'examples': missing,
+    })
+
+    for col in rules.get('numeric', []):
+        if col not in df.columns:
+            continue
+        check, coerced = check_numeric(df, col, rules.get('empty_as_missing', True))
+        report['checks'].append(check)
+        report['coerced'][col] = coerced
+
+    for col in rules.get('npi', []):
+        if col in df.columns:
+            report['checks'].extend(check_npi(df, col))
+
+    for col, max_rate in rules.get('max_null_rate', {}).items():
+        if col in df.columns:
+            report['checks'].append(check_null_rate(df, col, max_rate))
+
+    report['failures'] = [c for c in report['checks'] if c['bad_count'] > 0]
+    return report
+
+def failed(report: dict, rule: str, column: str | None = None) -> dict | None:
+    for check in report['failures']:
+        if check['rule'] == rule and (column is None or check['column'] == column):
+            return check
+    return None
 
 # ========== PART D CHECKS ==========
 
@@ -41,38 +131,43 @@ PARTD_NUMERIC_COLS = [
     'GE65_Tot_Benes',
 ]
 
-def run_partd_checks(df):
-    assert isinstance(df, pd.DataFrame)
-    assert len(df) > 0
+PARTD_RULES = {
+    'required': PARTD_REQUIRED_COLS,
+    'numeric': PARTD_NUMERIC_COLS,
+    'npi': ['Prscrbr_NPI'],
+}
 
-    missing = [c for c in PARTD_REQUIRED_COLS if c not in df.columns]
-    assert not missing
+def assert_partd_report(report: dict) -> None:
+    assert report['rows'] > 0
+    assert not failed(report, 'required')
 
     for c in PARTD_NUMERIC_COLS:
-        col = df[c].astype('string').str.strip()
-        original_missing = col.isna() | (col == '')
-        coerced = pd.to_numeric(df[c], errors = 'coerce')
-        bad_mask = coerced.isna() & ~original_missing
-        bad_count = bad_mask.sum()
+        bad = failed(report, 'numeric', c)
 
-        if bad_count > 0:
-            example = col[bad_mask].unique()[:10]
+        if bad is not None:
             raise AssertionError(
                 f'Column {c} has non-numeric values (excluding empty-as-missing).'
-                f'Bad count: {bad_count}. Examples: {list(example)}'
+                f'Bad count: {bad["bad_count"]}. Examples: {bad["examples"]}'
             )
-        
-        df[c] = coerced
-    
+
     print('run_partd_checks: numeric columns OK (empty strings treated as missing)')
 
-    npi = df['Prscrbr_NPI']
-    npi_str = npi.astype('string').str.replace(r'\.0$', '', regex = True).str.strip()
-    npi_digits = npi_str.str.fullmatch(r'\d{10}')
-    assert npi_str.notna().all(), 'Prscrbr_NPI has missing values'
+    assert not failed(report, 'not_null', 'Prscrbr_NPI'), 'Prscrbr_NPI has missing values'
+
+    bad_npi = failed(report, 'npi_format', 'Prscrbr_NPI')
+    assert bad_npi is None, f'Prscrbr_NPI column has invalid format (expected 10 digits). Bad rows: {bad_npi["bad_count"]}'
+
+def run_partd_checks(df):
+    assert isinstance(df, pd.DataFrame)
+    assert len(df) > 0
+
+    report = evaluate_rules(df, PARTD_RULES)
+    assert_partd_report(report)
+
+    for c in PARTD_NUMERIC_COLS:
+        df[c] = report['coerced'][c]
 
-    bad_npi = (~npi_digits).sum()
-    assert bad_npi == 0, f'Prscrbr_NPI column has invalid format (expected 10 digits). Bad rows: {bad_npi}'
+    return report
 
 # ========== PROVIDER CHECKS ==========
 
@@ -91,25 +186,33 @@ PROVIDER_NUMERIC_COLS = [
     'Tot_Mdcr_Alowd_Amt'
 ]
 
-def run_provider_checks(df):
-    assert isinstance(df, pd.DataFrame)
-    assert len(df) > 0
+PROVIDER_RULES = {
+    'required': PROVIDER_REQUIRED_COLS,
+    'numeric': PROVIDER_NUMERIC_COLS,
+    'npi': ['Rndrng_NPI'],
+    'empty_as_missing': False,
+}
 
-    missing = [c for c in PROVIDER_REQUIRED_COLS if c not in df.columns]
-    assert not missing
+def assert_provider_report(report: dict) -> None:
+    assert report['rows'] > 0
+    assert not failed(report, 'required')
 
     for c in PROVIDER_NUMERIC_COLS:
-        coerced = pd.to_numeric(df[c], errors = 'coerce')
-        bad_count = coerced.isna().sum() - df[c].isna().sum()
-        assert bad_count == 0, f'Column {c} has non-numeric values'
+        assert not failed(report, 'numeric', c), f'Column {c} has non-numeric values'
+
+    assert not failed(report, 'not_null', 'Rndrng_NPI'), 'Rndrng_NPI has missing values'
+
+    npi_bad = failed(report, 'npi_format', 'Rndrng_NPI')
+    assert npi_bad is None, f'Rndrng_NPI column has invalid format (expected 10 digits). Bad rows: {npi_bad["bad_count"]}'
+
+def run_provider_checks(df):
+    assert isinstance(df, pd.DataFrame)
+    assert len(df) > 0
 
-    npi = df['Rndrng_NPI']
-    npi_str = npi.astype('string').str.replace(r'\.0$', '', regex = True).str.strip()
-    npi_digits = npi_str.str.fullmatch(r'\d{10}')
-    assert npi_str.notna().all(), 'Rndrng_NPI has missing values'
+    report = evaluate_rules(df, PROVIDER_RULES)
+    assert_provider_report(report)
 
-    npi_bad = (~npi_digits).sum()
-    assert npi_bad == 0, f'Rndrng_NPI column has invalid format (expected 10 digits). Bad rows: {npi_bad}'
+    return report
 
 # ========== MERGED CHECKS ==========
 
@@ -149,4 +252,123 @@ def run_merged_checks(partd_df: pd.DataFrame, merged_df: pd.DataFrame) -> None:
 
     print('Merged checks passed')
 
+# ========== DUCKDB CHECKS ==========
+
+# Same rule sets and assertions as above, evaluated as aggregate queries so the
+# raw tables never have to be materialized in pandas.
+
+def quote(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+def trim_sql(expr: str) -> str:
+    # all whitespace, like Arrow's utf8_trim_whitespace (trim() strips spaces only)
+    return f"regexp_replace({expr}, '^\\s+|\\s+$', '', 'g')"
+
+def evaluate_rules_sql(con, relation: str, rules: dict) -> dict:
+    columns = [row[0] for row in con.execute(f'describe select * from {relation}').fetchall()]
+    rows = con.execute(f'select count(*) from {relation}').fetchone()[0]
+    report = {'rows': rows, 'checks': [], 'failures': [], 'coerced': {}}
+
+    missing = [c for c in rules.get('required', []) if c not in columns]
+    report['checks'].append({
+        'rule': 'required', 'column': None, 'bad_count': len(missing), 'examples': missing,
+    })
+
+    empty_as_missing = rules.get('empty_as_missing', True)
+
+    for col in rules.get('numeric', []):
+        if col not in columns:
+            continue
+
+        # the same pattern parse_numeric validates with: try_cast would also
+        # accept 'NaN', 'inf' or '1_000', which the pandas engine rejects
+        value = trim_sql(f'cast({quote(col)} as varchar)')
+        present = f"{value} <> ''" if empty_as_missing else f'{quote(col)} is not null'
+        bad_filter = f"{present} and not coalesce(regexp_matches({value}, '{NUMERIC_PATTERN}'), false)"
+
+        bad_count = con.execute(f'select count(*) from {relation} where {bad_filter}').fetchone()[0]
+        examples = []
+        if bad_count > 0:
+            examples = [r[0] for r in con.execute(
+                f'select distinct {value} from {relation} where {bad_filter} limit 10'
+            ).fetchall()]
+
+        report['checks'].append({'rule': 'numeric', 'column': col, 'bad_count': bad_count, 'examples': examples})
+
+    for col in rules.get('npi', []):
+        if col not in columns:
+            continue
+
+        null_count, bad_count = con.execute(f'''
+            select
+                count(*) filter (where {quote(col)} is null),
+                count(*) filter (
+                    where {quote(col)} is not null
+                    and not regexp_matches(cast({quote(col)} as varchar), '{NPI_PATTERN}')
+                )
+            from {relation}
+        ''').fetchone()
+
+        report['checks'].append({'rule': 'not_null', 'column': col, 'bad_count': null_count, 'examples': []})
+        report['checks'].append({'rule': 'npi_format', 'column': col, 'bad_count': bad_count, 'examples': []})
+
+    for col, max_rate in rules.get('max_null_rate', {}).items():
+        if col not in columns:
+            continue
+
+        null_rate = con.execute(
+            f'select coalesce(avg(({quote(col)} is null)::int), 0) from {relation}'
+        ).fetchone()[0]
+
+        report['checks'].append({
+            'rule': 'max_null_rate',
+            'column': col,
+            'bad_count': int(null_rate > max_rate),
+            'null_rate': null_rate,
+            'max_rate': max_rate,
+            'examples': [],
+        })
+
+    report['failures'] = [c for c in report['checks'] if c['bad_count'] > 0]
+    return report
+
+def run_merged_checks_sql(con, partd_relation: str, merged_relation: str) -> None:
+    partd_rows = con.execute(f'select count(*) from {partd_relation}').fetchone()[0]
+    merged_rows = con.execute(f'select count(*) from {merged_relation}').fetchone()[0]
+
+    assert merged_rows == partd_rows, (
+    f'Row count changed after merge:'
+    f'partd = {partd_rows}, merged = {merged_rows}'
+    )
+
+    merged_cols = [row[0] for row in con.execute(f'describe select * from {merged_relation}').fetchall()]
+    available_provider_cols = [c for c in PROVIDER_COLS if c in merged_cols]
+    assert available_provider_cols, 'No provider columns found in merged df'
+
+    all_null = ' and '.join(f'{quote(c)} is null' for c in available_provider_cols)
+    provider_na_rate = con.execute(
+        f'select coalesce(avg(({all_null})::int), 0) from {merged_relation}'
+    ).fetchone()[0]
+    print(f'Provider match missing rate: {provider_na_rate:.2%}')
+
+    if provider_na_rate > 0.2:
+        print('WARNING: More than 20% of Part D rows have no matched provider data')
+
+    key_cols = ['Prscrbr_NPI', 'Gnrc_Name']
+    keys = ', '.join(quote(c) for c in key_cols)
+    dupl_before = partd_rows - con.execute(
+        f'select count(*) from (select distinct {keys} from {partd_relation})'
+    ).fetchone()[0]
+    dupl_after = merged_rows - con.execute(
+        f'select count(*) from (select distinct {keys} from {merged_relation})'
+    ).fetchone()[0]
+    dupl_diff = dupl_after - dupl_before
+
+    print(
+        f'Duplicate rows by key {key_cols}: '
+        f'before = {dupl_before}, after = {dupl_after}, diff = {dupl_diff}'
+    )
+
+    print('Merged checks passed')
+
 
@@ -1,4 +1,5 @@
+from .cms_client import CMSDatasetClient
 from .partd import load_partd
 from .provider import load_provider
 
-__all__ = ['load_partd', 'load_provider']
\ No newline at end of file
+__all__ = ['CMSDatasetClient', 'load_partd', 'load_provider']
\ No newline at end of file
@@ -0,0 +1,410 @@
+from __future__ import annotations
+import requests
+import hashlib
+import threading
+import time
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+from requests.adapters import HTTPAdapter
+
+BASE_URL = 'https://data.cms.gov/data-api/v1/dataset'
+
+MAX_RETRIES = 5
+BASE_SLEEP = 2
+PAGE_SIZE = 5000
+MAX_WORKERS = 4
+MANIFEST_NAME = 'manifest.jsonl'
+PAGE_FORMATS = ('json', 'parquet')
+
+# every dataset is served by data.cms.gov, so the rate-limit pause is shared by
+# all clients and worker threads: a 429 slows down the whole process
+_rate_limit_lock = threading.Lock()
+_rate_limited_until = 0.0
+
+def today_str() -> str:
+    return datetime.today().strftime('%Y-%m-%d')
+
+def wait_for_rate_limit() -> None:
+    with _rate_limit_lock:
+        wait_time = _rate_limited_until - time.monotonic()
+
+    if wait_time > 0:
+        time.sleep(wait_time)
+
+def sleep_with_backoff(
+    attempt: int,
+    retry_after: int | None,
+    reason: str,
+    shared: bool = False
+) -> None:
+    global _rate_limited_until
+
+    if retry_after is not None:
+        sleep_time = retry_after
+    else:
+        sleep_time = BASE_SLEEP * (2 ** (attempt - 1))
+
+    print(f'{reason}. Sleeping {sleep_time}s (attempt {attempt} / {MAX_RETRIES})...')
+
+    if not shared:
+        time.sleep(sleep_time)
+        return
+
+    with _rate_limit_lock:
+        _rate_limited_until = max(_rate_limited_until, time.monotonic() + sleep_time)
+
+    wait_for_rate_limit()
+
+def make_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    session = requests.Session()
+
+    adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = pool_size)
+    session.mount('https://', adapter)
+
+    session.headers.update({
+        'accept': 'application/json',
+        'accept-encoding': 'gzip, deflate',
+        'connection': 'keep-alive',
+    })
+
+    return session
+
+def page_path(run_dir: Path, page_num: int, fmt: str = 'json') -> Path:
+    return run_dir / f'page_{page_num:05d}.{fmt}'
+
+def page_schema(page: list[dict]) -> pa.Schema:
+    # the Data API returns every field as a string; pin that for all pages so
+    # a page with an all-null column cannot drift to a different type
+    return pa.schema([(name, pa.string()) for name in page[0]])
+
+def encode_page(page: list[dict], fmt: str, schema: pa.Schema | None) -> bytes:
+    if fmt == 'json':
+        return json.dumps(page).encode('utf-8')
+
+    table = pa.Table.from_pylist(page, schema = schema)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression = 'zstd')
+    return sink.getvalue().to_pybytes()
+
+def save_page(
+    run_dir: Path,
+    page_num: int,
+    offset: int,
+    page: list[dict],
+    fmt: str = 'json',
+    schema: pa.Schema | None = None
+) -> Path:
+    output_path = page_path(run_dir, page_num, fmt)
+    tmp_path = output_path.with_suffix(f'.{fmt}.tmp')
+
+    payload = encode_page(page, fmt, schema)
+    tmp_path.write_bytes(payload)
+    tmp_path.replace(output_path)
+
+    # one line per page, appended after the page is in place: a crash leaves at
+    # worst a truncated last line, which read_manifest skips
+    entry = {
+        'page': page_num,
+        'offset': offset,
+        'rows': len(page),
+        'sha256': hashlib.sha256(payload).hexdigest(),
+    }
+
+    with (run_dir / MANIFEST_NAME).open('a', encoding = 'utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+
+    print(f'Saved page {page_num} with {len(page)} rows to {output_path}')
+    return output_path
+
+def read_manifest(run_dir: Path) -> dict[int, dict]:
+    manifest_path = run_dir / MANIFEST_NAME
+    entries: dict[int, dict] = {}
+
+    if not manifest_path.exists():
+        return entries
+
+    with manifest_path.open('r', encoding = 'utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            # later lines win: a page re-fetched after a resume overrides the old entry
+            entries[entry['page']] = entry
+
+    return entries
+
+def is_valid_page(path: Path, entry: dict | None) -> tuple[bool, int]:
+    if not path.exists():
+        return False, 0
+
+    payload = path.read_bytes()
+
+    if entry is not None:
+        ok = hashlib.sha256(payload).hexdigest() == entry['sha256']
+        return ok, entry['rows']
+
+    # dumps written before the manifest existed: fall back to parsing the page
+    if path.suffix == '.parquet':
+        try:
+            rows = pq.read_metadata(path).num_rows
+        except (OSError, pa.ArrowInvalid):
+            return False, 0
+
+        return rows > 0, rows
+
+    try:
+        page = json.loads(payload)
+    except json.JSONDecodeError:
+        return False, 0
+
+    return isinstance(page, list) and len(page) > 0, len(page)
+
+def clear_pages(run_dir: Path, formats: tuple[str, ...] = PAGE_FORMATS) -> int:
+    # load_raw_folder reads every page_* file in the folder, so pages left by an
+    # earlier, longer dump (or one in the other format) would be read as part
+    # of this one
+    stale = [
+        path
+        for fmt in formats
+        for pattern in (f'page_*.{fmt}', f'page_*.{fmt}.tmp')
+        for path in run_dir.glob(pattern)
+    ]
+
+    for path in stale:
+        path.unlink()
+
+    if stale:
+        print(f'Removed {len(stale)} page file(s) of an earlier dump from {run_dir}')
+
+    return len(stale)
+
+def find_resume_point(run_dir: Path, fmt: str = 'json') -> tuple[int, int]:
+    entries = read_manifest(run_dir)
+    page_num = 1
+    offset = 0
+
+    while True:
+        path = page_path(run_dir, page_num, fmt)
+        ok, rows = is_valid_page(path, entries.get(page_num))
+
+        if not ok:
+            break
+
+        page_num += 1
+        offset += rows
+
+        if rows < PAGE_SIZE:
+            break
+
+    if page_num > 1:
+        print(f'Resuming at page {page_num} (offset {offset}), {page_num - 1} valid pages found in {run_dir}')
+
+    return page_num, offset
+
+class CMSDatasetClient:
+
+    def __init__(
+        self,
+        uuid: str,
+        raw_dir: Path,
+        workers: int = MAX_WORKERS,
+        fmt: str = 'json'
+    ):
+        if fmt not in PAGE_FORMATS:
+            raise ValueError(f'Unknown page format {fmt!r}, expected one of {PAGE_FORMATS}')
+
+        self.uuid = uuid
+        self.raw_dir = raw_dir
+        self.workers = workers
+        self.fmt = fmt
+        self.schema: pa.Schema | None = None
+        self.url = f'{BASE_URL}/{uuid}/data'
+        self.session = make_session(pool_size = workers)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> CMSDatasetClient:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def fetch_page(self, offset: int = 0, limit: int = PAGE_SIZE) -> list[dict]:
+
+        params = {
+            'offset': offset,
+            'size': limit
+        }
+
+        for attempt in range(1, MAX_RETRIES + 1):
+            wait_for_rate_limit()
+
+            try:
+                response = self.session.get(
+                    self.url,
+                    params = params,
+                    timeout = 50
+                )
+
+                if response.status_code == 429:
+                    retry_after = response.headers.get('Retry-After')
+                    retry_after = int(retry_after) if retry_after else None
+
+                    if attempt == MAX_RETRIES:
+                        print('Got 429 too many times, giving up.')
+                        raise requests.exceptions.HTTPError(response = response)
+
+                    sleep_with_backoff(attempt, retry_after, 'Got 429 (rate limited)', shared = True)
+                    continue
+
+                response.raise_for_status()
+                data = response.json()
+
+                if isinstance(data, list):
+                    return data
+                else:
+                    return [data]
+
+            except requests.exceptions.Timeout:
+                if attempt == MAX_RETRIES:
+                    print('Request timed out, giving up.')
+                    raise
+
+                sleep_with_backoff(attempt, None, 'Timeout')
+
+            except requests.exceptions.RequestException as e:
+                if attempt == MAX_RETRIES:
+                    print('Request failed, giving up.')
+                    raise
+
+                sleep_with_backoff(attempt, None, f'Request failed {e}')
+
+        return []
+
+    def save_page(self, run_dir: Path, page_num: int, offset: int, page: list[dict]) -> Path:
+        if self.fmt == 'parquet' and self.schema is None:
+            first_page = page_path(run_dir, 1, 'parquet')
+
+            if page_num > 1 and first_page.exists():
+                self.schema = pq.read_schema(first_page).remove_metadata()
+            else:
+                self.schema = page_schema(page)
+
+        return save_page(run_dir, page_num, offset, page, self.fmt, self.schema)
+
+    def dump_raw_pages_concurrent(
+        self,
+        run_dir: Path,
+        max_rows: int | None,
+        page_num: int = 1,
+        offset: int = 0
+    ) -> int:
+        # offsets are fixed multiples of PAGE_SIZE, so page_num follows from the offset
+        # and the files are identical to the serial dump whatever order requests finish in
+        next_offset = offset
+        rows_fetched = offset
+        in_flight = deque()
+
+        with ThreadPoolExecutor(max_workers = self.workers) as pool:
+
+            def submit_next() -> None:
+                nonlocal next_offset
+
+                if max_rows is not None and next_offset >= max_rows:
+                    return
+
+                in_flight.append(pool.submit(self.fetch_page, offset = next_offset, limit = PAGE_SIZE))
+                next_offset += PAGE_SIZE
+
+            for _ in range(self.workers):
+                submit_next()
+
+            while in_flight:
+                page = in_flight.popleft().result()
+
+                if not page:
+                    break
+
+                if max_rows is not None:
+                    page = page[:max_rows - rows_fetched]
+
+                self.save_page(run_dir, page_num, rows_fetched, page)
+
+                rows_fetched += len(page)
+                page_num += 1
+
+                if len(page) < PAGE_SIZE:
+                    break
+
+                if max_rows is not None and rows_fetched >= max_rows:
+                    break
+
+                submit_next()
+
+            for future in in_flight:
+                future.cancel()
+
+        return rows_fetched
+
+    def dump_raw_pages(
+        self,
+        max_rows: int | None = None,
+        run_date: str | None = None,
+        resume: bool = False
+    ) -> Path:
+        if run_date is None:
+            run_date = today_str()
+
+        run_dir = self.raw_dir / run_date
+        run_dir.mkdir(parents = True, exist_ok = True)
+
+        if resume:
+            # only pages in this run's format can be resumed
+            clear_pages(run_dir, tuple(fmt for fmt in PAGE_FORMATS if fmt != self.fmt))
+            page_num, offset = find_resume_point(run_dir, self.fmt)
+        else:
+            page_num, offset = 1, 0
+            clear_pages(run_dir)
+            (run_dir / MANIFEST_NAME).unlink(missing_ok = True)
+
+        if self.workers > 1:
+            rows_fetched = self.dump_raw_pages_concurrent(run_dir, max_rows, page_num, offset)
+            print(f'Total rows fetched (raw pages): {rows_fetched}')
+            return run_dir
+
+        rows_fetched = offset
+
+        while True:
+            page = self.fetch_page(offset = offset, limit = PAGE_SIZE)
+
+            if not page:
+                break
+
+            if max_rows is not None:
+                remaining = max_rows - rows_fetched
+
+                if remaining <= 0:
+                    break
+
+                if len(page) > remaining:
+                    page = page[:remaining]
+
+            self.save_page(run_dir, page_num, offset, page)
+
+            rows_fetched += len(page)
+            page_num += 1
+            offset += len(page)
+
+            if max_rows is not None and rows_fetched >= max_rows:
+                break
+
+        print(f'Total rows fetched (raw pages): {rows_fetched}')
+        return run_dir
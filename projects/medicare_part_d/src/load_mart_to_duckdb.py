@@ -1,33 +1,34 @@
 from pathlib import Path
-import duckdb
+
+from utils.load_mart_to_duckdb import load_marts
+
+# python -m src.load_mart_to_duckdb, from projects/medicare_part_d: loads the
+# marts below into the project's DuckDB file through the shared catalog loader
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 MART_DIR = PROJECT_ROOT / 'data' / 'mart'
-
-paths = {
-    'mart_drug_year': MART_DIR / 'mart_drug_year_2026-02-01.parquet',
-    'mart_prescriber_drug_year': MART_DIR / 'mart_prescriber_drug_year_2026-02-01.parquet',
-    'mart_prescriber_year': MART_DIR / 'mart_prescriber_year_2026-02-01.parquet'
+DB_PATH = MART_DIR / 'medicare_part_d.duckdb'
+
+marts = {
+    'mart_drug_year': {
+        'path': MART_DIR / 'mart_drug_year_2026-02-01',
+        'mode': 'table',
+        'indexes': ['generic_name'],
+    },
+    'mart_prescriber_drug_year': {
+        'path': MART_DIR / 'mart_prescriber_drug_year_2026-02-01',
+        'mode': 'table',
+        'indexes': ['npi', 'generic_name'],
+    },
+    'mart_prescriber_year': {
+        'path': MART_DIR / 'mart_prescriber_year_2026-02-01',
+        'mode': 'table',
+        'indexes': ['npi'],
+    },
 }
 
-print('PROJECT_ROOT:', PROJECT_ROOT)
-print('MART_DIR:', MART_DIR)
-
-for name, path in paths.items():
-    print(f'{name}: {path} -> exists={path.exists()}')
-
-con = duckdb.connect(str(MART_DIR / 'medicare_part_d.duckdb'))
-
-for name, path in paths.items():
-    if not path.exists():
-        raise FileNotFoundError(f'{name}: file not found: {path}')
-    con.execute(f"""
-        create or replace table {name} AS
-        select *
-        from read_parquet('{path.as_posix()}');
-    """)
-    print(f'Created/updated table: {name}')
-
-con.close()
-print('Done.')
+def main(force=False, hash_contents=False):
+    load_marts(DB_PATH, marts, force=force, hash_contents=hash_contents)
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import pandas as pd
+
+# NPIs are 10-digit identifiers: as int64 they take 8 bytes instead of a
+# ~60-byte Python string and merge/groupby on integer hash keys
+NPI_COLS = [
+    'Prscrbr_NPI',
+    'Rndrng_NPI',
+    'npi',
+]
+
+# low-cardinality text (a few thousand distinct values at most over ~25M rows)
+CATEGORICAL_COLS = [
+    'Prscrbr_State_Abrvtn',
+    'Prscrbr_State_FIPS',
+    'Prscrbr_Type',
+    'Prscrbr_Type_Src',
+    'Brnd_Name',
+    'Gnrc_Name',
+    'GE65_Sprsn_Flag',
+    'GE65_Bene_Sprsn_Flag',
+    'generic_name',
+]
+
+def npi_to_int(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_integer_dtype(s):
+        return s
+
+    if pd.api.types.is_float_dtype(s):
+        values = s
+    else:
+        values = pd.to_numeric(
+            s.astype('string').str.strip().str.removesuffix('.0'),
+            errors = 'raise'
+        )
+
+    # unmatched rows of a left join carry missing NPIs: keep them nullable
+    return values.astype('Int64' if values.isna().any() else 'int64')
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    for col in NPI_COLS:
+        if col in df.columns:
+            df[col] = npi_to_int(df[col])
+
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    return df
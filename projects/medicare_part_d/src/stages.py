@@ -0,0 +1,62 @@
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+from src import build_mart, transform
+from utils.stage_cache import CACHE_MAX_BYTES, code_files, run_stage
+
+# python -m src.stages [transform] [mart], from projects/medicare_part_d: each
+# stage is skipped (or its outputs restored from the cache) when its inputs,
+# code and parameters match an earlier run, so after an edit only that stage
+# and the ones downstream of it recompute
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = PROJECT_ROOT / 'data' / '.stage_cache'
+
+RUN_DATE = '2026-02-01'
+YEAR = 2023
+
+def define_stages(run_date: str = RUN_DATE, year: int = YEAR) -> dict[str, dict]:
+    clean_path = transform.CLEAN_DIR / f'medicare_partd_provider_clean_{run_date}.parquet'
+    mart_paths = build_mart.get_project_paths(run_date)
+
+    return {
+        'transform': {
+            'func': transform.run_pipeline,
+            'params': {'run_date': run_date},
+            'inputs': [
+                transform.RAW_DIR / 'cms_provider' / run_date,
+                transform.RAW_DIR / 'cms_partd' / run_date,
+            ],
+            'outputs': [clean_path],
+            'code': code_files(transform.__file__),
+        },
+        'mart': {
+            'func': build_mart.main,
+            'params': {'run_date': run_date, 'year': year},
+            'inputs': [clean_path],
+            'outputs': [
+                mart_paths['base_mart_path'],
+                mart_paths['prescriber_year_mart_path'],
+                mart_paths['drug_year_mart_path'],
+            ],
+            'code': code_files(build_mart.__file__),
+        },
+    }
+
+def main(names: list[str] | None = None, max_bytes: int = CACHE_MAX_BYTES) -> None:
+    stages = define_stages()
+
+    unknown = [name for name in names or [] if name not in stages]
+    if unknown:
+        raise ValueError(f'Unknown stage(s) {unknown}, expected some of {list(stages)}')
+
+    # always in pipeline order, whatever order they were asked for in
+    for name, stage in stages.items():
+        if names and name not in names:
+            continue
+
+        run_stage(name, cache_dir = CACHE_DIR, max_bytes = max_bytes, **stage)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
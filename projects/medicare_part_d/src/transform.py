@@ -1,61 +1,436 @@
 from __future__ import annotations
+import duckdb
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import argparse
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from src.dq_checks import (
+    PARTD_NUMERIC_COLS,
+    PARTD_RULES,
+    PROVIDER_RULES,
+    assert_partd_report,
+    assert_provider_report,
+    evaluate_rules_sql,
+    quote,
     run_partd_checks,
     run_provider_checks,
-    run_merged_checks
+    run_merged_checks,
+    run_merged_checks_sql,
+    trim_sql
 )
+from src.schema import CATEGORICAL_COLS, NPI_COLS, apply_schema
+from utils.numeric import INTEGER_PATTERN
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 RAW_DIR = PROJECT_ROOT / 'data' / 'raw'
 CLEAN_DIR = PROJECT_ROOT/ 'data' / 'clean'
 CLEAN_DIR.mkdir(parents = True, exist_ok = True)
 
-def load_raw_folder(folder: Path) -> pd.DataFrame:
+MAX_BATCH_MB = 512
+DUCKDB_MEMORY_LIMIT = '8GB'
+JOIN_ENGINES = ('pandas', 'duckdb')
+
+# the decode pool is opt-in (workers > 1). Measured with
+# bench/bench_load_raw_folder.py on one CPU, 5,000-row pages: 2 workers beat
+# the serial path from about 8 pages (0.25-0.37s vs 0.38-0.42s; 2.2s vs
+# 2.7-3.7s at 64 pages), as the workers' Arrow decode is cheaper than a
+# DataFrame per page. Below that the process startup dominates, and more
+# workers than cores only add overhead. Smaller folders decode serially
+POOL_MIN_PAGES = 8
+
+MERGED_RENAME_MAP = {
+    'Tot_Benes_x': 'PartD_Tot_Benes',
+    'Tot_Benes_y': 'Prov_Tot_Benes',
+    'Tot_Srvcs': 'Prov_Tot_Srvcs',
+    'Tot_Mdcr_Pymt_Amt': 'Prov_Tot_Mdcr_Pymt_Amt',
+    'Tot_Mdcr_Alowd_Amt': 'Prov_Tot_Mdcr_Alowd_Amt'
+}
+
+def load_raw_parquet_pages(paths: list[Path]) -> pd.DataFrame:
+    # pages landed as Parquet share one pinned schema, so the folder scans as a
+    # single dataset instead of one json.load + DataFrame per page
+    table = ds.dataset([str(p) for p in paths], format = 'parquet').to_table()
+    return table.to_pandas()
+
+def decode_json_page(path: Path) -> pa.Table:
+    payload = path.read_bytes()
+
+    # orjson is an optional fast path; the stdlib parser gives the same objects
+    if orjson is not None:
+        data = orjson.loads(payload)
+    else:
+        data = json.loads(payload)
+
+    return pa.Table.from_pylist(data)
+
+def load_raw_json_pages_parallel(paths: list[Path], workers: int) -> pd.DataFrame:
+    # pages are decoded to Arrow in worker processes and only the columnar
+    # tables travel back, so the parent never holds per-page dict lists
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        tables = list(pool.map(decode_json_page, paths, chunksize = 8))
+
+    # a column that is all-null in one page is typed null there; let concat
+    # promote it to the type the other pages agree on
+    table = pa.concat_tables(tables, promote_options = 'default')
+    return table.to_pandas()
+
+def load_raw_folder(folder: Path, workers: int = 1) -> pd.DataFrame:
+    parquet_pages = sorted(folder.glob('page_*.parquet'))
+
+    if parquet_pages:
+        df = load_raw_parquet_pages(parquet_pages)
+        print(f'Loaded {len(df)} rows from {folder}')
+        return df
+
+    json_pages = sorted(folder.glob('page_*.json'))
+
+    if workers > 1 and len(json_pages) >= POOL_MIN_PAGES:
+        df = load_raw_json_pages_parallel(json_pages, workers)
+        print(f'Loaded {len(df)} rows from {folder} ({workers} decode workers)')
+        return df
+
     frames: list[pd.DataFrame] = []
 
-    for path in sorted(folder.glob('page_*.json')):
+    for path in json_pages:
         with path.open('r', encoding = 'utf-8') as f:
             data = json.load(f)
         frames.append(pd.DataFrame(data))
 
     if not frames:
-        raise RuntimeError(f'No page_*.json files found in {folder}')
+        raise RuntimeError(f'No page_*.parquet or page_*.json files found in {folder}')
     
     df = pd.concat(frames, ignore_index = True)
     print(f'Loaded {len(df)} rows from {folder}')
     return df
 
-def run_pipeline(run_date: str):
+def iter_page_frames(folder: Path) -> Iterator[pd.DataFrame]:
+    parquet_pages = sorted(folder.glob('page_*.parquet'))
+
+    if parquet_pages:
+        dataset = ds.dataset([str(p) for p in parquet_pages], format = 'parquet')
+        for batch in dataset.to_batches():
+            yield batch.to_pandas()
+        return
+
+    json_pages = sorted(folder.glob('page_*.json'))
+
+    if not json_pages:
+        raise RuntimeError(f'No page_*.parquet or page_*.json files found in {folder}')
+
+    for path in json_pages:
+        with path.open('r', encoding = 'utf-8') as f:
+            data = json.load(f)
+        yield pd.DataFrame(data)
+
+def iter_raw_batches(folder: Path, max_batch_mb: int = MAX_BATCH_MB) -> Iterator[pd.DataFrame]:
+    # pages are buffered until their in-memory size reaches max_batch_mb, so peak
+    # memory is bounded by the batch size rather than by the whole dataset
+    max_batch_bytes = max_batch_mb * 1024 ** 2
+    frames: list[pd.DataFrame] = []
+    buffered_bytes = 0
+
+    for frame in iter_page_frames(folder):
+        frames.append(frame)
+        buffered_bytes += frame.memory_usage(deep = True).sum()
+
+        if buffered_bytes >= max_batch_bytes:
+            yield pd.concat(frames, ignore_index = True)
+            frames = []
+            buffered_bytes = 0
+
+    if frames:
+        yield pd.concat(frames, ignore_index = True)
+
+def merge_partd_provider(partd_df: pd.DataFrame, provider_df: pd.DataFrame) -> pd.DataFrame:
+    # both sides are typed first, so the join runs on int64 NPIs
+    merged_df = apply_schema(partd_df).merge(
+        apply_schema(provider_df),
+        left_on = 'Prscrbr_NPI',
+        right_on = 'Rndrng_NPI',
+        how = 'left'
+    )
+
+    # unmatched rows turn Rndrng_NPI into float; bring it back to a nullable int
+    return apply_schema(merged_df.rename(columns = MERGED_RENAME_MAP))
+
+def stable_field(field: pa.Field) -> pa.Field:
+    # an all-null object column in the first batch would otherwise pin the
+    # whole file to the null type
+    if pa.types.is_null(field.type):
+        return field.with_type(pa.string())
+
+    # categoricals get int8 or int16 indices depending on how many values a
+    # batch happens to hold; use one index width for every row group
+    if pa.types.is_dictionary(field.type):
+        return field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+
+    return field
+
+def stable_schema(schema: pa.Schema) -> pa.Schema:
+    return pa.schema([stable_field(f) for f in schema], metadata = schema.metadata)
+
+def run_pipeline_streaming(
+    run_date: str,
+    max_batch_mb: int = MAX_BATCH_MB,
+    decode_workers: int = 1
+):
+    provider_dir = RAW_DIR / 'cms_provider' / run_date
+    partd_dir = RAW_DIR / 'cms_partd' / run_date
+
+    # the provider file is one row per NPI and small next to Part D, so it stays
+    # in memory as the right side of every batch join
+    provider_df = load_raw_folder(provider_dir, workers = decode_workers)
+    run_provider_checks(provider_df)
+
+    output_path = CLEAN_DIR / f'medicare_partd_provider_clean_{run_date}.parquet'
+    tmp_path = output_path.with_suffix('.parquet.tmp')
+
+    writer = None
+    schema = None
+    total_rows = 0
+
+    try:
+        for batch_num, partd_batch in enumerate(iter_raw_batches(partd_dir, max_batch_mb), start = 1):
+            run_partd_checks(partd_batch)
+
+            # a batch without decimals would come out as int64; keep every
+            # batch on the same type so the row groups share one schema
+            partd_batch[PARTD_NUMERIC_COLS] = partd_batch[PARTD_NUMERIC_COLS].astype('float64')
+
+            merged_batch = merge_partd_provider(partd_batch, provider_df)
+            run_merged_checks(partd_batch, merged_batch)
+
+            table = pa.Table.from_pandas(merged_batch, preserve_index = False)
+
+            if writer is None:
+                schema = stable_schema(table.schema)
+                writer = pq.ParquetWriter(tmp_path, schema)
+
+            writer.write_table(table.cast(schema))
+
+            total_rows += len(merged_batch)
+            print(f'Batch {batch_num}: wrote {len(merged_batch)} rows ({total_rows} total)')
+
+    finally:
+        if writer is not None:
+            writer.close()
+
+    tmp_path.replace(output_path)
+
+    print(f'Saved clean merged data to {output_path}')
+    return output_path
+
+def raw_source_sql(folder: Path) -> str:
+    parquet_pages = sorted(folder.glob('page_*.parquet'))
+
+    if parquet_pages:
+        files = [p.as_posix() for p in parquet_pages]
+        return f'read_parquet({files!r})'
+
+    json_pages = sorted(folder.glob('page_*.json'))
+
+    if not json_pages:
+        raise RuntimeError(f'No page_*.parquet or page_*.json files found in {folder}')
+
+    # pin every field to VARCHAR like the pandas loader sees it; auto-detection
+    # would turn NPIs and amounts into numbers before the checks run
+    with json_pages[0].open('r', encoding = 'utf-8') as f:
+        first_page = json.load(f)
+
+    columns = {c: 'VARCHAR' for c in first_page[0]}
+    files = [p.as_posix() for p in json_pages]
+    return f"read_json({files!r}, format = 'array', columns = {columns!r})"
+
+def npi_sql(expr: str) -> str:
+    return f"cast(regexp_replace(trim({expr}), '\\.0$', '') as bigint)"
+
+def integer_cols_sql(con, relation: str, numeric_cols: list[str]) -> list[str]:
+    # parse_numeric's rule: int64 when every value of the column is a present
+    # integer, float64 otherwise (blanks, decimals), so both engines agree
+    counts = ',\n            '.join(
+        f"count(*) filter (where not coalesce(regexp_matches({trim_sql(f'cast({quote(col)} as varchar)')}, '{INTEGER_PATTERN}'), false))"
+        for col in numeric_cols
+    )
+    non_integers = con.execute(f'select {counts} from {relation}').fetchone()
+
+    return [col for col, n in zip(numeric_cols, non_integers) if n == 0]
+
+def merged_select_sql(con, numeric_cols: list[str], integer_cols: list[str]) -> str:
+    partd_cols = [r[0] for r in con.execute('describe select * from partd_raw').fetchall()]
+    provider_cols = [r[0] for r in con.execute('describe select * from provider_raw').fetchall()]
+    overlap = set(partd_cols) & set(provider_cols)
+
+    select_list = []
+
+    # mirror DataFrame.merge: overlapping names get _x/_y before the renames
+    for col in partd_cols:
+        name = f'{col}_x' if col in overlap else col
+        name = MERGED_RENAME_MAP.get(name, name)
+
+        if col in numeric_cols:
+            sql_type = 'bigint' if col in integer_cols else 'double'
+            expr = f"try_cast(nullif({trim_sql(f'partd.{quote(col)}')}, '') as {sql_type})"
+        elif col in NPI_COLS:
+            expr = npi_sql(f'partd.{quote(col)}')
+        else:
+            expr = f'partd.{quote(col)}'
+
+        select_list.append(f'{expr} as {quote(name)}')
+
+    for col in provider_cols:
+        name = f'{col}_y' if col in overlap else col
+        name = MERGED_RENAME_MAP.get(name, name)
+
+        if col in NPI_COLS:
+            expr = npi_sql(f'provider.{quote(col)}')
+        else:
+            expr = f'provider.{quote(col)}'
+
+        select_list.append(f'{expr} as {quote(name)}')
+
+    return ',\n            '.join(select_list)
+
+def apply_schema_parquet(con, source_path: Path, output_path: Path) -> Path:
+    # the typed layer of the pandas engine (apply_schema) over a Parquet file,
+    # one row group at a time: categoricals hold the sorted distinct values of
+    # the whole column and NPIs with gaps are nullable, as on a full frame
+    source = f"read_parquet('{source_path.as_posix()}')"
+    parquet_file = pq.ParquetFile(source_path)
+    names = parquet_file.schema_arrow.names
+
+    categories = {
+        col: sorted(row[0] for row in con.execute(
+            f'select distinct {quote(col)} from {source} where {quote(col)} is not null'
+        ).fetchall())
+        for col in CATEGORICAL_COLS if col in names
+    }
+
+    npi_cols = [col for col in NPI_COLS if col in names]
+    null_counts = con.execute(
+        'select ' + ', '.join(f'count(*) - count({quote(col)})' for col in npi_cols) + f' from {source}'
+    ).fetchone() if npi_cols else []
+    npi_dtypes = {col: 'Int64' if nulls else 'int64' for col, nulls in zip(npi_cols, null_counts)}
+
+    writer = None
+
+    try:
+        for i in range(parquet_file.num_row_groups):
+            df = parquet_file.read_row_group(i).to_pandas()
+
+            for col, values in categories.items():
+                df[col] = pd.Categorical(df[col], categories = values)
+
+            df = df.astype(npi_dtypes)
+            table = pa.Table.from_pandas(df, preserve_index = False)
+
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+
+            writer.write_table(table)
+
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return output_path
+
+def run_pipeline_duckdb(run_date: str, memory_limit: str = DUCKDB_MEMORY_LIMIT):
+    provider_dir = RAW_DIR / 'cms_provider' / run_date
+    partd_dir = RAW_DIR / 'cms_partd' / run_date
+
+    output_path = CLEAN_DIR / f'medicare_partd_provider_clean_{run_date}.parquet'
+    tmp_path = output_path.with_suffix('.parquet.tmp')
+
+    # DuckDB scans the raw pages directly and spills the join to disk past
+    # memory_limit, so neither side is ever materialized as a pandas frame
+    con = duckdb.connect()
+    con.execute(f"set memory_limit = '{memory_limit}'")
+
+    try:
+        con.execute(f'create view provider_raw as select * from {raw_source_sql(provider_dir)}')
+        con.execute(f'create view partd_raw as select * from {raw_source_sql(partd_dir)}')
+
+        assert_provider_report(evaluate_rules_sql(con, 'provider_raw', PROVIDER_RULES))
+        assert_partd_report(evaluate_rules_sql(con, 'partd_raw', PARTD_RULES))
+
+        integer_cols = integer_cols_sql(con, 'partd_raw', PARTD_NUMERIC_COLS)
+
+        con.execute(f'''
+            copy (
+                with partd as (
+                    select row_number() over () as __row_num, *
+                    from partd_raw
+                )
+                select
+                    {merged_select_sql(con, PARTD_NUMERIC_COLS, integer_cols)}
+                from partd
+                left join provider_raw as provider
+                    on {npi_sql('partd.Prscrbr_NPI')} = {npi_sql('provider.Rndrng_NPI')}
+                order by partd.__row_num
+            ) to '{tmp_path.as_posix()}' (format parquet)
+        ''')
+
+        run_merged_checks_sql(con, 'partd_raw', f"read_parquet('{tmp_path.as_posix()}')")
+
+        typed_path = output_path.with_suffix('.parquet.typed.tmp')
+        apply_schema_parquet(con, tmp_path, typed_path)
+
+    finally:
+        con.close()
+
+    typed_path.replace(output_path)
+    tmp_path.unlink()
+
+    print(f'Saved clean merged data to {output_path}')
+    return output_path
+
+def run_pipeline(
+    run_date: str,
+    streaming: bool = False,
+    max_batch_mb: int = MAX_BATCH_MB,
+    decode_workers: int = 1,
+    engine: str = 'pandas'
+):
+    if engine not in JOIN_ENGINES:
+        raise ValueError(f'Unknown join engine {engine!r}, expected one of {JOIN_ENGINES}')
+
+    if engine == 'duckdb':
+        # DuckDB scans the pages itself and spills past its memory limit: the
+        # pandas batching and decode pool options have nothing to act on
+        if streaming or max_batch_mb != MAX_BATCH_MB or decode_workers != 1:
+            raise ValueError(
+                "streaming, max_batch_mb and decode_workers only apply to engine='pandas'"
+            )
+
+        return run_pipeline_duckdb(run_date)
+
+    if streaming:
+        return run_pipeline_streaming(run_date, max_batch_mb, decode_workers)
+
     # load
     provider_dir = RAW_DIR / 'cms_provider' / run_date
     partd_dir = RAW_DIR / 'cms_partd' / run_date
 
-    provider_df = load_raw_folder(provider_dir)
-    partd_df = load_raw_folder(partd_dir)
+    provider_df = load_raw_folder(provider_dir, workers = decode_workers)
+    partd_df = load_raw_folder(partd_dir, workers = decode_workers)
 
     # checks
     run_provider_checks(provider_df)
     run_partd_checks(partd_df)
 
     # merge
-    merged_df = partd_df.merge(
-        provider_df,
-        left_on = 'Prscrbr_NPI',
-        right_on = 'Rndrng_NPI',
-        how = 'left'
-    )
-
-    merged_df = merged_df.rename(columns = {
-        'Tot_Benes_x': 'PartD_Tot_Benes',
-        'Tot_Benes_y': 'Prov_Tot_Benes',
-        'Tot_Srvcs': 'Prov_Tot_Srvcs',
-        'Tot_Mdcr_Pymt_Amt': 'Prov_Tot_Mdcr_Pymt_Amt',
-        'Tot_Mdcr_Alowd_Amt': 'Prov_Tot_Mdcr_Alowd_Amt'
-    })
+    merged_df = merge_partd_provider(partd_df, provider_df)
 
     # merged checks
     run_merged_checks(partd_df, merged_df)
@@ -68,4 +443,18 @@ def run_pipeline(run_date: str):
     return output_path
 
 if __name__ == '__main__':
-    run_pipeline(run_date = '2026-02-01')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = 'Validate and join the raw pages into the clean file.')
+    parser.add_argument('--run-date', default = '2026-02-01')
+    parser.add_argument('--engine', choices = JOIN_ENGINES, default = 'pandas')
+    parser.add_argument('--streaming', action = 'store_true', help = 'join Part D in batches (pandas engine)')
+    parser.add_argument('--max-batch-mb', type = int, default = MAX_BATCH_MB, help = 'batch size when streaming')
+    parser.add_argument('--decode-workers', type = int, default = 1, help = f'processes decoding raw JSON pages, used from {POOL_MIN_PAGES} pages (pandas engine)')
+    args = parser.parse_args()
+
+    run_pipeline(
+        run_date = args.run_date,
+        streaming = args.streaming,
+        max_batch_mb = args.max_batch_mb,
+        decode_workers = args.decode_workers,
+        engine = args.engine
+    )
\ No newline at end of file
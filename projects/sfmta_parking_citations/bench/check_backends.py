@@ -0,0 +1,62 @@
+import sys
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from build_marts import compare_backends
+from clean import RAW_DATETIME_FORMAT, clean_raw_df, raw_table_to_df, save_clean_df
+
+# Backend parity gate: every mart must come out of the pandas and the DuckDB
+# backend as the same frame, dtypes included (build_marts.compare_backends).
+# Run on a synthetic export cleaned by clean.py into a temporary project, so
+# it needs no downloaded data; any mismatch raises and the exit status is
+# non-zero. Run by `make check_backends`.
+#
+#   python bench/check_backends.py [n_rows]
+
+N_ROWS = 200_000
+
+def synthetic_raw_table(n_rows, seed = 0):
+    rng = np.random.default_rng(seed)
+
+    start = pd.Timestamp('2021-01-01').value // 10 ** 9
+    end = pd.Timestamp('2026-01-01').value // 10 ** 9
+    issued = pd.to_datetime(rng.integers(start, end, n_rows), unit = 's').floor('min')
+
+    # zipf-distributed violations, each with its fine, as in the export
+    violation = rng.zipf(1.5, n_rows) % 120
+    fines = np.array([76.0, 96.0, 110.0, 299.0, 1100.0])[violation % 5]
+    states = np.array(['CA'] * 20 + ['NV', 'OR', 'WA', 'TX', 'NY', 'AZ'])
+
+    # some blank points, dates, states and fines, to cover the null paths
+    latitude = 37.70 + rng.random(n_rows) * 0.12
+    longitude = -122.51 + rng.random(n_rows) * 0.15
+    no_point = rng.random(n_rows) < 0.01
+
+    return pa.table({
+        'Citation Number': [f'9{i:09d}' for i in range(n_rows)],
+        'Citation Issued DateTime': pa.array(np.asarray(issued.strftime(RAW_DATETIME_FORMAT), dtype = object), mask = rng.random(n_rows) < 0.001),
+        'Violation': np.array([f'TRC7.2.{i}' for i in range(120)])[violation],
+        'Violation Description': np.array([f'VIOLATION {i}' for i in range(120)])[violation],
+        'Citation Location': [f'{i % 900} MARKET ST' for i in range(n_rows)],
+        'Vehicle Plate State': pa.array(states[rng.integers(0, len(states), n_rows)], mask = rng.random(n_rows) < 0.01),
+        'Fine Amount': pa.array([f'${fine:.2f}' for fine in fines], mask = rng.random(n_rows) < 0.002),
+        'Latitude': pa.array(latitude, mask = no_point),
+        'Longitude': pa.array(longitude, mask = no_point),
+    })
+
+def main(n_rows = N_ROWS):
+    with tempfile.TemporaryDirectory() as tmp:
+        project_root = Path(tmp)
+
+        save_clean_df(clean_raw_df(raw_table_to_df(synthetic_raw_table(n_rows))), project_root)
+        compare_backends(project_root)
+
+    print(f'backend parity: all marts identical on {n_rows:,} synthetic rows')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,47 @@
+WITH cells AS (
+    SELECT
+        -- 6-character cells (~1.2 x 0.6 km); left(geohash, 7) keeps the
+        -- block-level cells of the mart, shorter prefixes zoom out further
+        left(geohash, 6) AS cell,
+        year,
+        sum(citations_count) AS citations_count,
+        sum(total_fines_amount) AS total_fines_amount,
+        avg(cell_latitude) AS cell_latitude,
+        avg(cell_longitude) AS cell_longitude
+    FROM
+        mart_geo_cell_month
+    WHERE
+        year = (
+            SELECT
+                max(year)
+            FROM
+                mart_geo_cell_month
+        )
+    GROUP BY
+        cell,
+        year
+),
+totals AS (
+    SELECT
+        sum(total_fines_amount) AS all_fines_amount
+    FROM
+        cells
+)
+SELECT
+    c.cell,
+    c.year,
+    c.citations_count,
+    c.total_fines_amount,
+    round(
+        c.total_fines_amount / nullif(t.all_fines_amount, 0),
+        4
+    ) AS share_of_year_fines,
+    round(c.cell_latitude, 5) AS cell_latitude,
+    round(c.cell_longitude, 5) AS cell_longitude
+FROM
+    cells AS c
+    CROSS JOIN totals AS t
+ORDER BY
+    c.total_fines_amount DESC
+LIMIT
+    10;
\ No newline at end of file
@@ -6,4 +6,5 @@
 .read analysis/04_yoy_change_fines.sql
 .read analysis/05_mom_change_fines_2025.sql
 .read analysis/06_seasonality.sql
-.read analysis/07_vehicle_state_non_ca_share.sql
\ No newline at end of file
+.read analysis/07_vehicle_state_non_ca_share.sql
+.read analysis/08_citation_hotspots.sql
\ No newline at end of file
@@ -3,25 +3,47 @@ OR REPLACE VIEW mart_citations_year AS
 SELECT
     *
 FROM
-    read_parquet('data/mart/mart_citations_year.parquet');
+    read_parquet(
+        'data/mart/mart_citations_year/**/*.parquet',
+        hive_partitioning = true
+    );
 
 CREATE
 OR REPLACE VIEW mart_citations_year_month AS
 SELECT
     *
 FROM
-    read_parquet('data/mart/mart_citations_year_month.parquet');
+    read_parquet(
+        'data/mart/mart_citations_year_month/**/*.parquet',
+        hive_partitioning = true
+    );
 
 CREATE
 OR REPLACE VIEW mart_state_year AS
 SELECT
     *
 FROM
-    read_parquet('data/mart/mart_state_year.parquet');
+    read_parquet(
+        'data/mart/mart_state_year/**/*.parquet',
+        hive_partitioning = true
+    );
 
 CREATE
 OR REPLACE VIEW mart_citations_month AS
 SELECT
     *
 FROM
-    read_parquet('data/mart/mart_citations_month.parquet');
\ No newline at end of file
+    read_parquet(
+        'data/mart/mart_citations_month/**/*.parquet',
+        hive_partitioning = true
+    );
+
+CREATE
+OR REPLACE VIEW mart_geo_cell_month AS
+SELECT
+    *
+FROM
+    read_parquet(
+        'data/mart/mart_geo_cell_month/**/*.parquet',
+        hive_partitioning = true
+    );
\ No newline at end of file
@@ -1,20 +1,160 @@
 from pathlib import Path
+import time
+import duckdb
+import numpy as np
 import pandas as pd
+import pyarrow.dataset as ds
+
+from geo import cell_centers
+from mart_checks import SHARE_RANGE, format_timings, validate_mart
+from schema import apply_schema
+
+import repo_root  # puts the repo root on sys.path, for utils
+from utils.mart_writer import read_mart, write_mart
+
+# pandas: groupbys over the clean frame in memory
+# duckdb: the same marts as SQL, multi-threaded and out-of-core, over the clean
+# Parquet dataset (or a registered frame); both return the same frame
+BACKENDS = ('pandas', 'duckdb')
+
+# validation specs (see mart_checks.py), next to each mart's builder. Every
+# builder groups by the mart grain after dropping null keys, so uniqueness and
+# non-null keys are implied and only re-checked with skip_implied=False
+MART_SPECS = {}
+
+# the export starts in 2021; no citation is issued in the future, so the upper
+# bound follows the clock and a new year's citations pass without an edit
+FIRST_YEAR = 2021
 
 # Load clean data
 
-def load_clean_df(project_root):
-    clean_path = project_root / 'data' / 'clean' / 'parking_citations_clean.parquet'
+def get_clean_path(project_root):
+    # year=YYYY/month=M partitioned dataset written by clean.py
+    clean_path = project_root / 'data' / 'clean' / 'parking_citations_clean'
     if not clean_path.exists():
-        raise FileNotFoundError(f'Clean parquet not found: {clean_path}')
-    
-    df = pd.read_parquet(clean_path)
+        raise FileNotFoundError(f'Clean dataset not found: {clean_path}')
+
+    return clean_path
+
+def load_clean_df(project_root, years=None):
+    clean_path = get_clean_path(project_root)
+
+    # an incremental run reads only the year partitions it rebuilds
+    filters = ds.field('year').isin(list(years)) if years is not None else None
+
+    # partition keys come back as int64: restore the declared clean dtypes
+    df = apply_schema(read_mart(clean_path, filters=filters))
 
     return df
 
+# DuckDB backend
+
+def connect_clean(clean):
+    con = duckdb.connect()
+
+    if isinstance(clean, pd.DataFrame):
+        con.register('clean', clean)
+        like = clean.head(0)
+    else:
+        clean = Path(clean)
+
+        if clean.is_dir():
+            source = f"read_parquet('{clean.as_posix()}/**/*.parquet', hive_partitioning = true)"
+        else:
+            source = f"read_parquet('{clean.as_posix()}')"
+
+        con.execute(f'create view clean as select * from {source}')
+        like = apply_schema(ds.dataset(clean, format='parquet', partitioning='hive').schema.empty_table().to_pandas())
+
+    return con, like
+
+def align_dtypes(df, like, count_like, count_cols, measure_like):
+    # pandas keeps the clean dtypes on the group keys, and its sizes / sums (and
+    # the shares computed from them) are nullable Int64 / Float64 exactly when
+    # the column they were aggregated from is. Categorical keys are stored as
+    # strings in the marts
+    for col in df.columns:
+        if col in like.columns:
+            if isinstance(like[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('string')
+            else:
+                df[col] = df[col].astype(like[col].dtype)
+            continue
+
+        source = count_like if col in count_cols else measure_like
+        dtype = like[source].dtype
+        nullable = isinstance(dtype, pd.api.extensions.ExtensionDtype) and not isinstance(dtype, pd.CategoricalDtype)
+
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype('Int64' if nullable else 'int64')
+        else:
+            df[col] = df[col].astype('Float64' if nullable else 'float64')
+
+    return df
+
+def categories_to_strings(df):
+    # group keys come out of the clean schema as categoricals; the marts keep
+    # them as text, the way the DuckDB backend returns them
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('string')
+
+    return df
+
+def normalize_state(s):
+    # upper-cased plate states, missing ones as 'UNKNOWN'. On a categorical
+    # column this runs once per category and only the row codes are remapped
+    # (code -1, a missing state, picks the trailing 'UNKNOWN')
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.str.upper().fillna('UNKNOWN')
+
+    labels = np.append(s.cat.categories.str.upper().to_numpy(dtype=object), 'UNKNOWN')
+    label_codes, categories = pd.factorize(labels, sort=True)
+
+    return pd.Series(
+        pd.Categorical.from_codes(label_codes[s.cat.codes.to_numpy()], categories=categories),
+        index=s.index,
+    )
+
+def run_mart_sql(clean, sql, count_like, count_cols, measure_like='fine_amount'):
+    con, like = connect_clean(clean)
+    df = con.execute(sql).df()
+    con.close()
+
+    return align_dtypes(df, like, count_like, count_cols, measure_like)
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend!r}, expected one of {BACKENDS}')
+
 # Build mart: mart_citations_year
 
-def build_mart_citations_year(df_clean):
+def build_mart_citations_year(df_clean, backend='pandas'):
+    check_backend(backend)
+
+    if backend == 'duckdb':
+        return run_mart_sql(df_clean, """
+            with grouped as (
+                select
+                    violation_description,
+                    year,
+                    count(*) as citations_count,
+                    sum(fine_amount) as total_fines_amount
+                from clean
+                where violation_description is not null
+                  and year is not null
+                  and fine_amount is not null
+                group by all
+            )
+            select
+                *,
+                total_fines_amount / nullif(citations_count, 0) as avg_fine_amount,
+                citations_count / sum(citations_count) over (partition by year) as share_of_year_citations,
+                total_fines_amount / sum(total_fines_amount) over (partition by year) as share_of_year_fines
+            from grouped
+            order by violation_description, year
+        """, count_like='fine_amount', count_cols=['citations_count', 'share_of_year_citations'])
+
     required_cols = ['violation_description', 'year', 'fine_amount']
 
     for col in required_cols:
@@ -39,56 +179,64 @@ def build_mart_citations_year(df_clean):
     grouped['share_of_year_citations'] = (grouped['citations_count'] / grouped.groupby('year')['citations_count'].transform('sum'))
     grouped['share_of_year_fines'] = (grouped['total_fines_amount'] / grouped.groupby('year')['total_fines_amount'].transform('sum'))
 
-    return grouped
-
-def validate_mart_citations_year(df_mart):
-    grain_cols = ['violation_description', 'year']
-
-    grain_dups = df_mart.duplicated(subset=grain_cols).sum()
-    assert grain_dups == 0, f'Found {grain_dups} duplicates for grain {grain_cols}'
-
-    for col in grain_cols:
-        nulls = df_mart[col].isna().sum()
-        assert nulls == 0, f'Column {col} contains {nulls} null values in mart'
-
-    bad_year = ((df_mart['year'] < 2021) | (df_mart['year'] > 2025)).sum()
-    assert bad_year == 0, f'Found {bad_year} rows with year outside 2021..2025'
-
-    bad_count = (df_mart['citations_count'] <= 0).sum()
-    assert bad_count == 0, f"Found {bad_count} rows with citations_count <= 0"
-
-    bad_amount = (df_mart['total_fines_amount'] < 0).sum()
-    assert bad_amount == 0, "Negative values in total_fines_amount are present"
-
-    if 'avg_fine_amount' in df_mart.columns:
-        bad_avg = (df_mart['avg_fine_amount'].fillna(0) < 0).sum()
-        assert bad_avg == 0, "Negative values in avg_fine_amount are present"
-
-    eps = 1e-6
-    for col in ['share_of_year_citations', 'share_of_year_fines']:
-        assert col in df_mart.columns, f"Missing expected column: {col}"
-
-        bad_share = (
-            (df_mart[col] < -eps) |
-            (df_mart[col] > 1 + eps)
-        ).sum()
-        assert bad_share == 0, f"Incorrect '{col}' values (outside [0,1])"
-
-        s = df_mart.groupby('year')[col].sum()
-        assert ((s - 1.0).abs() < 1e-3).all(), f"{col} does not sum to ~1 by year"
-
-def save_mart_citations_year(df_mart, project_root):
+    return categories_to_strings(grouped)
+
+MART_SPECS['mart_citations_year'] = {
+    'grain': ['violation_description', 'year'],
+    'not_null': ['citations_count', 'total_fines_amount'],
+    'ranges': {
+        'year': (FIRST_YEAR, pd.Timestamp.now().year),
+        'citations_count': (1, None),
+        'total_fines_amount': (0, None),
+        'avg_fine_amount': (0, None),
+        'share_of_year_citations': SHARE_RANGE,
+        'share_of_year_fines': SHARE_RANGE,
+    },
+    'share_sums': {'share_of_year_citations': 'year', 'share_of_year_fines': 'year'},
+    'implied': ['grain_unique', 'grain_not_null'],
+}
+
+def validate_mart_citations_year(df_mart, skip_implied=True):
+    return validate_mart(df_mart, 'mart_citations_year', MART_SPECS['mart_citations_year'], skip_implied)
+
+def save_mart_citations_year(df_mart, project_root, partitions_only=False):
     mart_dir = project_root / 'data' / 'mart'
     mart_dir.mkdir(parents=True, exist_ok=True)
 
-    mart_path = mart_dir / 'mart_citations_year.parquet'
-    df_mart.to_parquet(mart_path, index=False)
+    mart_path = mart_dir / 'mart_citations_year'
+    write_mart(df_mart, mart_path, partition_cols=['year'], sort_by=['violation_description'], partitions_only=partitions_only)
 
     print(f'Saved mart_citations_year to: {mart_path}')
 
 # Build mart: mart_citations_year_month
 
-def build_mart_citations_year_month(df_clean):
+def build_mart_citations_year_month(df_clean, backend='pandas'):
+    check_backend(backend)
+
+    if backend == 'duckdb':
+        return run_mart_sql(df_clean, """
+            with grouped as (
+                select
+                    violation_description,
+                    year,
+                    month,
+                    count(*) as citations_count,
+                    coalesce(sum(fine_amount), 0) as total_fines_amount
+                from clean
+                where violation_description is not null
+                  and year is not null
+                  and month is not null
+                group by all
+            )
+            select
+                *,
+                total_fines_amount / nullif(citations_count, 0) as avg_fine_amount,
+                citations_count / sum(citations_count) over (partition by year) as share_of_year_citations,
+                total_fines_amount / sum(total_fines_amount) over (partition by year) as share_of_year_fines
+            from grouped
+            order by violation_description, year, month
+        """, count_like='fine_amount', count_cols=['citations_count', 'share_of_year_citations'])
+
     required_cols = ['violation_description', 'month', 'year', 'fine_amount']
 
     for col in required_cols:
@@ -113,43 +261,67 @@ def build_mart_citations_year_month(df_clean):
     grouped['share_of_year_citations'] = grouped['citations_count'] / grouped.groupby('year')['citations_count'].transform('sum')
     grouped['share_of_year_fines'] = grouped['total_fines_amount'] / grouped.groupby('year')['total_fines_amount'].transform('sum')
 
-    return grouped
-
-def validate_mart_citations_year_month(df_mart):
-    grain_cols = ['violation_description', 'year', 'month']
-    grain_dups = df_mart.duplicated(subset=grain_cols).sum()
-    assert grain_dups == 0, f'Found {grain_dups} duplicates for grain {grain_cols}'
-
-    for col in grain_cols:
-        nulls = df_mart[col].isna().sum()
-        assert nulls == 0, f'Column {col} contains {nulls} empty values in mart'
-
-    bad_month = ((df_mart['month'] < 1) | (df_mart['month'] > 12)).sum()
-    assert bad_month == 0, f'Found {bad_month} rows with month outside [1-12]'
-
-    assert (df_mart['citations_count'] >= 0).all()
-    assert (df_mart['total_fines_amount'] >= 0).all()
-
-    eps = 1e-6
-    for col in ['share_of_year_citations', 'share_of_year_fines']:
-        bad = ((df_mart[col] < -eps) | (df_mart[col] > 1 + eps)).sum()
-        assert bad == 0, f"Incorrect '{col}' values"
-
-    s1 = df_mart.groupby('year')['share_of_year_fines'].sum()
-    assert ((s1 - 1.0).abs() < 1e-3).all(), "share_of_year_fines does not sum to ~1 by year"
-
-def save_mart_citations_year_month(df_mart, project_root):
+    return categories_to_strings(grouped)
+
+MART_SPECS['mart_citations_year_month'] = {
+    'grain': ['violation_description', 'year', 'month'],
+    'not_null': ['citations_count', 'total_fines_amount'],
+    'ranges': {
+        'month': (1, 12),
+        'citations_count': (0, None),
+        'total_fines_amount': (0, None),
+        'share_of_year_citations': SHARE_RANGE,
+        'share_of_year_fines': SHARE_RANGE,
+    },
+    'share_sums': {'share_of_year_fines': 'year'},
+    'implied': ['grain_unique', 'grain_not_null'],
+}
+
+def validate_mart_citations_year_month(df_mart, skip_implied=True):
+    return validate_mart(df_mart, 'mart_citations_year_month', MART_SPECS['mart_citations_year_month'], skip_implied)
+
+def save_mart_citations_year_month(df_mart, project_root, partitions_only=False):
     mart_dir = project_root / 'data' / 'mart'
     mart_dir.mkdir(parents=True, exist_ok=True)
 
-    mart_path = mart_dir / 'mart_citations_year_month.parquet'
-    df_mart.to_parquet(mart_path, index=False)
+    mart_path = mart_dir / 'mart_citations_year_month'
+    write_mart(df_mart, mart_path, partition_cols=['year'], sort_by=['month', 'violation_description'], partitions_only=partitions_only)
 
     print(f'Saved mart_citations_year_month to: {mart_path}')
 
 # Build mart: mart_state_year
 
-def build_mart_state_year(df_clean):
+def build_mart_state_year(df_clean, backend='pandas'):
+    check_backend(backend)
+
+    if backend == 'duckdb':
+        return run_mart_sql(df_clean, """
+            with grouped as (
+                select
+                    coalesce(upper(vehicle_state), 'UNKNOWN') as vehicle_state,
+                    year,
+                    count(*) as citations_count,
+                    coalesce(sum(fine_amount), 0) as total_fines_amount,
+                    avg(fine_amount) as avg_fine_amount
+                from clean
+                where year is not null
+                group by all
+            ),
+            totals as (
+                select
+                    *,
+                    sum(citations_count) over (partition by year)::bigint as year_total_citations,
+                    sum(total_fines_amount) over (partition by year) as total_year_fines
+                from grouped
+            )
+            select
+                *,
+                citations_count / year_total_citations as share_of_total_citations,
+                total_fines_amount / total_year_fines as share_of_total_fines
+            from totals
+            order by vehicle_state, year
+        """, count_like='vehicle_state', count_cols=['citations_count', 'year_total_citations', 'share_of_total_citations'])
+
     required_cols = ['vehicle_state', 'year', 'fine_amount']
 
     for col in required_cols:
@@ -158,9 +330,7 @@ def build_mart_state_year(df_clean):
         
     df = df_clean[required_cols].copy()
 
-    df['vehicle_state'] = df['vehicle_state'].str.upper()
-
-    df['vehicle_state'] = df['vehicle_state'].fillna('UNKNOWN')
+    df['vehicle_state'] = normalize_state(df['vehicle_state'])
 
     df = df.dropna(subset=['year'])
 
@@ -180,39 +350,66 @@ def build_mart_state_year(df_clean):
     grouped['share_of_total_citations'] = grouped['citations_count'] / grouped['year_total_citations']
     grouped['share_of_total_fines'] = grouped['total_fines_amount'] / grouped['total_year_fines']
 
-    return grouped
-
-def validate_mart_state_year(df_mart):
-    grain_cols = ['vehicle_state', 'year']
-
-    for col in grain_cols:
-        nulls = df_mart[col].isna().sum()
-        assert nulls == 0, f'Column {col} contains {nulls} empty values in mart'
+    return categories_to_strings(grouped)
 
-    assert (df_mart['citations_count'] >= 0).all(), "Negative values 'citations_count' are present."
-    assert (df_mart['total_fines_amount'] >= 0).all(), "Negative values 'total_fines_amount' are present."
+MART_SPECS['mart_state_year'] = {
+    'grain': ['vehicle_state', 'year'],
+    'not_null': ['citations_count', 'total_fines_amount'],
+    'ranges': {
+        'citations_count': (0, None),
+        'total_fines_amount': (0, None),
+        'share_of_total_citations': SHARE_RANGE,
+        'share_of_total_fines': SHARE_RANGE,
+    },
+    'implied': ['grain_unique', 'grain_not_null'],
+}
 
-    esp = 1e-6
-    for col in ['share_of_total_citations', 'share_of_total_fines']:
-        if col in df_mart.columns:
-            bad_share = (
-                (df_mart[col] < -esp) |
-                (df_mart[col] > 1 + esp)
-            ).sum()
-            assert bad_share == 0, f"Incorrect '{col}'"
+def validate_mart_state_year(df_mart, skip_implied=True):
+    return validate_mart(df_mart, 'mart_state_year', MART_SPECS['mart_state_year'], skip_implied)
 
-def save_mart_state_year(df_mart, project_root):
+def save_mart_state_year(df_mart, project_root, partitions_only=False):
     mart_dir = project_root / 'data' / 'mart'
     mart_dir.mkdir(parents=True, exist_ok=True)
 
-    mart_path = mart_dir / 'mart_state_year.parquet'
-    df_mart.to_parquet(mart_path, index=False)
+    mart_path = mart_dir / 'mart_state_year'
+    write_mart(df_mart, mart_path, partition_cols=['year'], sort_by=['vehicle_state'], partitions_only=partitions_only)
 
     print(f'Saved mart_state_year to: {mart_path}')
 
 # Build mart: mart_citations_month
 
-def build_mart_citations_month(df_clean):
+def build_mart_citations_month(df_clean, backend='pandas'):
+    check_backend(backend)
+
+    if backend == 'duckdb':
+        return run_mart_sql(df_clean, """
+            with grouped as (
+                select
+                    month,
+                    year,
+                    count(*) as citations_count,
+                    coalesce(sum(fine_amount), 0) as total_fines_amount,
+                    avg(fine_amount) as avg_fine_amount
+                from clean
+                where month is not null
+                  and year is not null
+                group by all
+            ),
+            totals as (
+                select
+                    *,
+                    sum(citations_count) over (partition by year)::bigint as year_total_citations,
+                    sum(total_fines_amount) over (partition by year) as total_year_fines
+                from grouped
+            )
+            select
+                *,
+                citations_count / year_total_citations as share_of_total_citations,
+                total_fines_amount / total_year_fines as share_of_total_fines
+            from totals
+            order by month, year
+        """, count_like='month', count_cols=['citations_count', 'year_total_citations', 'share_of_total_citations'])
+
     required_cols = ['year', 'month', 'fine_amount']
 
     for col in required_cols:
@@ -239,67 +436,371 @@ def build_mart_citations_month(df_clean):
     grouped['share_of_total_citations'] = grouped['citations_count'] / grouped['year_total_citations']
     grouped['share_of_total_fines'] = grouped['total_fines_amount'] / grouped['total_year_fines']
 
+    return categories_to_strings(grouped)
+
+MART_SPECS['mart_citations_month'] = {
+    'grain': ['month', 'year'],
+    'not_null': ['citations_count', 'total_fines_amount'],
+    'ranges': {
+        'citations_count': (0, None),
+        'total_fines_amount': (0, None),
+        'share_of_total_citations': SHARE_RANGE,
+        'share_of_total_fines': SHARE_RANGE,
+    },
+    'implied': ['grain_unique', 'grain_not_null'],
+}
+
+def validate_mart_citations_month(df_mart, skip_implied=True):
+    return validate_mart(df_mart, 'mart_citations_month', MART_SPECS['mart_citations_month'], skip_implied)
+
+def save_mart_citations_month(df_mart, project_root, partitions_only=False):
+    mart_dir = project_root / 'data' / 'mart'
+    mart_dir.mkdir(parents=True, exist_ok=True)
+
+    mart_path = mart_dir / 'mart_citations_month'
+    write_mart(df_mart, mart_path, partition_cols=['year'], sort_by=['month'], partitions_only=partitions_only)
+
+    print(f'Saved mart_citations_month to: {mart_path}')
+
+# Build mart: mart_geo_cell_month
+
+def add_cell_centers(grouped):
+    grouped['cell_latitude'], grouped['cell_longitude'] = cell_centers(grouped['geohash'].to_numpy(dtype=str))
+
     return grouped
 
-def validate_mart_citations_month(df_mart):
-    grain_cols = ['month', 'year']
-    grain_dups = df_mart.duplicated(subset=grain_cols).sum()
-    assert grain_dups == 0, f'Found {grain_dups} duplicates for grain {grain_cols}'
+def build_mart_geo_cell_month(df_clean, backend='pandas'):
+    check_backend(backend)
+
+    # citations and fines per geohash cell (see geo.py) and month: hotspot
+    # queries read this table, and coarser cells are prefixes of the geohash
+    if backend == 'duckdb':
+        grouped = run_mart_sql(df_clean, """
+            select
+                geohash,
+                year,
+                month,
+                count(*) as citations_count,
+                coalesce(sum(fine_amount), 0) as total_fines_amount,
+                avg(fine_amount) as avg_fine_amount
+            from clean
+            where geohash is not null
+              and year is not null
+              and month is not null
+            group by all
+            order by geohash, year, month
+        """, count_like='year', count_cols=['citations_count'])
+
+        return add_cell_centers(grouped)
+
+    required_cols = ['geohash', 'year', 'month', 'fine_amount']
 
-    for col in grain_cols:
-        nulls = df_mart[col].isna().sum()
-        assert nulls == 0, f'Column {col} contains {nulls} empty values in mart'
+    for col in required_cols:
+        if col not in df_clean.columns:
+            raise KeyError(f"Expected column '{col}' is missing.")
 
-    assert (df_mart['citations_count'] >= 0).all(), "Negative values 'citations_count' are present."
-    assert (df_mart['total_fines_amount'] >= 0).all(), "Negative values 'total_fines_amount' are present."
+    df = df_clean[required_cols].dropna(subset=['geohash', 'year', 'month'])
 
-    esp = 1e-6
-    for col in ['share_of_total_citations', 'share_of_total_fines']:
-        if col in df_mart.columns:
-            bad_share = (
-                (df_mart[col] < -esp) |
-                (df_mart[col] > 1 + esp)
-            ).sum()
-            assert bad_share == 0, f"Incorrect '{col}'"
+    grouped = (
+        df
+        .groupby(['geohash', 'year', 'month'], as_index=False, observed=True)
+        .agg(
+            citations_count=('year', 'size'),
+            total_fines_amount=('fine_amount', 'sum'),
+            avg_fine_amount=('fine_amount', 'mean')
+        )
+    )
 
-def save_mart_citations_month(df_mart, project_root):
+    # the categorical key groups in category order; the mart is keyed by text
+    grouped['geohash'] = grouped['geohash'].astype('string')
+    grouped = grouped.sort_values(['geohash', 'year', 'month']).reset_index(drop=True)
+
+    return add_cell_centers(grouped)
+
+MART_SPECS['mart_geo_cell_month'] = {
+    'grain': ['geohash', 'year', 'month'],
+    'not_null': ['citations_count', 'total_fines_amount', 'cell_latitude', 'cell_longitude'],
+    'ranges': {
+        'month': (1, 12),
+        'citations_count': (1, None),
+        'total_fines_amount': (0, None),
+        'avg_fine_amount': (0, None),
+        'cell_latitude': (-90, 90),
+        'cell_longitude': (-180, 180),
+    },
+    'implied': ['grain_unique', 'grain_not_null'],
+}
+
+def validate_mart_geo_cell_month(df_mart, skip_implied=True):
+    return validate_mart(df_mart, 'mart_geo_cell_month', MART_SPECS['mart_geo_cell_month'], skip_implied)
+
+def save_mart_geo_cell_month(df_mart, project_root, partitions_only=False):
     mart_dir = project_root / 'data' / 'mart'
     mart_dir.mkdir(parents=True, exist_ok=True)
 
-    mart_path = mart_dir / 'mart_citations_month.parquet'
-    df_mart.to_parquet(mart_path, index=False)
+    # sorted by cell, so a geohash prefix filter skips most row groups
+    mart_path = mart_dir / 'mart_geo_cell_month'
+    write_mart(df_mart, mart_path, partition_cols=['year'], sort_by=['geohash', 'month'], partitions_only=partitions_only)
+
+    print(f'Saved mart_geo_cell_month to: {mart_path}')
+
+# Mart DAG: the clean data is aggregated once, at the finest grain any mart
+# needs, and every mart is rolled up from that (a few hundred thousand rows
+# at most instead of one row per citation)
+
+BASE_GRAIN = ['violation_description', 'vehicle_state', 'year', 'month']
+
+def build_mart_base_grain(df_clean, backend='pandas'):
+    check_backend(backend)
+
+    # the marts drop nulls on different keys, so null keys are kept here and
+    # filtered per mart; rows and non-null fines are counted separately because
+    # mart_citations_year only counts citations with a fine amount
+    if backend == 'duckdb':
+        con, like = connect_clean(df_clean)
+        base = con.execute("""
+            select
+                violation_description,
+                coalesce(upper(vehicle_state), 'UNKNOWN') as vehicle_state,
+                year,
+                month,
+                count(*) as citations_count,
+                count(fine_amount) as fines_count,
+                coalesce(sum(fine_amount), 0) as total_fines_amount
+            from clean
+            where year is not null
+            group by all
+        """).df()
+        con.close()
+
+        # a categorical like (read from the Parquet schema) carries no categories
+        for col in ['violation_description', 'vehicle_state', 'year', 'month']:
+            dtype = like[col].dtype
+            base[col] = base[col].astype('category' if isinstance(dtype, pd.CategoricalDtype) else dtype)
+
+        return base, like
+
+    like = df_clean.head(0)
+
+    df = df_clean[['violation_description', 'vehicle_state', 'year', 'month', 'fine_amount']]
+    df = df[df['year'].notna()]
+    df = df.assign(vehicle_state=normalize_state(df['vehicle_state']))
+
+    base = (
+        df
+        .groupby(BASE_GRAIN, as_index=False, dropna=False)
+        .agg(
+            citations_count=('year', 'size'),
+            fines_count=('fine_amount', 'count'),
+            total_fines_amount=('fine_amount', 'sum')
+        )
+    )
 
-    print(f'Saved mart_citations_month to: {mart_path}')
+    return base, like
 
-def main():
-    project_root = Path(__file__).resolve().parents[1]
+def add_year_shares(grouped, citations_col, fines_col):
+    grouped[citations_col] = grouped['citations_count'] / grouped.groupby('year')['citations_count'].transform('sum')
+    grouped[fines_col] = grouped['total_fines_amount'] / grouped.groupby('year')['total_fines_amount'].transform('sum')
+
+    return grouped
+
+def add_year_totals(grouped):
+    grouped['year_total_citations'] = grouped.groupby('year')['citations_count'].transform('sum')
+    grouped['total_year_fines'] = grouped.groupby('year')['total_fines_amount'].transform('sum')
+
+    grouped['share_of_total_citations'] = grouped['citations_count'] / grouped['year_total_citations']
+    grouped['share_of_total_fines'] = grouped['total_fines_amount'] / grouped['total_year_fines']
+
+    return grouped
+
+def derive_mart_citations_year(base, like):
+    grouped = (
+        base[base['violation_description'].notna() & (base['fines_count'] > 0)]
+        .groupby(['violation_description', 'year'], as_index=False)
+        .agg(
+            citations_count=('fines_count', 'sum'),
+            total_fines_amount=('total_fines_amount', 'sum')
+        )
+    )
+
+    grouped['avg_fine_amount'] = grouped['total_fines_amount'] / grouped['citations_count'].where(grouped['citations_count'] != 0)
+    grouped = add_year_shares(grouped, 'share_of_year_citations', 'share_of_year_fines')
+
+    return align_dtypes(grouped, like, 'fine_amount', ['citations_count', 'share_of_year_citations'], 'fine_amount')
+
+def derive_mart_citations_year_month(base, like):
+    grouped = (
+        base[base['violation_description'].notna() & base['month'].notna()]
+        .groupby(['violation_description', 'year', 'month'], as_index=False)
+        .agg(
+            citations_count=('citations_count', 'sum'),
+            total_fines_amount=('total_fines_amount', 'sum')
+        )
+    )
+
+    grouped['avg_fine_amount'] = grouped['total_fines_amount'] / grouped['citations_count'].where(grouped['citations_count'] != 0)
+    grouped = add_year_shares(grouped, 'share_of_year_citations', 'share_of_year_fines')
 
+    return align_dtypes(grouped, like, 'fine_amount', ['citations_count', 'share_of_year_citations'], 'fine_amount')
+
+def derive_mart_state_year(base, like):
+    grouped = (
+        base
+        .groupby(['vehicle_state', 'year'], as_index=False)
+        .agg(
+            citations_count=('citations_count', 'sum'),
+            fines_count=('fines_count', 'sum'),
+            total_fines_amount=('total_fines_amount', 'sum')
+        )
+    )
+
+    # mean over the citations that have a fine, as in build_mart_state_year
+    grouped.insert(
+        grouped.columns.get_loc('total_fines_amount') + 1,
+        'avg_fine_amount',
+        grouped['total_fines_amount'] / grouped['fines_count'].where(grouped['fines_count'] != 0),
+    )
+    grouped = add_year_totals(grouped.drop(columns='fines_count'))
+
+    return align_dtypes(grouped, like, 'vehicle_state', ['citations_count', 'year_total_citations', 'share_of_total_citations'], 'fine_amount')
+
+def derive_mart_citations_month(base, like):
+    grouped = (
+        base[base['month'].notna()]
+        .groupby(['month', 'year'], as_index=False)
+        .agg(
+            citations_count=('citations_count', 'sum'),
+            fines_count=('fines_count', 'sum'),
+            total_fines_amount=('total_fines_amount', 'sum')
+        )
+    )
+
+    grouped.insert(
+        grouped.columns.get_loc('total_fines_amount') + 1,
+        'avg_fine_amount',
+        grouped['total_fines_amount'] / grouped['fines_count'].where(grouped['fines_count'] != 0),
+    )
+    grouped = add_year_totals(grouped.drop(columns='fines_count'))
+
+    return align_dtypes(grouped, like, 'month', ['citations_count', 'year_total_citations', 'share_of_total_citations'], 'fine_amount')
+
+def build_marts_dag(df_clean, backend='pandas'):
+    base, like = build_mart_base_grain(df_clean, backend)
+    print('mart base grain shape:', base.shape)
+
+    return {
+        'mart_citations_year': derive_mart_citations_year(base, like),
+        'mart_citations_year_month': derive_mart_citations_year_month(base, like),
+        'mart_state_year': derive_mart_state_year(base, like),
+        'mart_citations_month': derive_mart_citations_month(base, like),
+        # one row per cell and month is finer than the base grain, so this
+        # mart is aggregated from the clean data directly
+        'mart_geo_cell_month': build_mart_geo_cell_month(df_clean, backend),
+    }
+
+MART_BUILDERS = {
+    'mart_citations_year': build_mart_citations_year,
+    'mart_citations_year_month': build_mart_citations_year_month,
+    'mart_state_year': build_mart_state_year,
+    'mart_citations_month': build_mart_citations_month,
+    'mart_geo_cell_month': build_mart_geo_cell_month,
+}
+
+def compare_backends(project_root):
+    # parity + timing check: every mart must come out of both backends as the
+    # same frame, dtypes included
+    clean_path = get_clean_path(project_root)
+
+    start = time.perf_counter()
     df_clean = load_clean_df(project_root)
-    print('Clean shape:', df_clean.shape)
+    load_seconds = time.perf_counter() - start
+    print(f'pandas load of clean data: {load_seconds:.2f}s')
+
+    timings = {}
+
+    for name, build in MART_BUILDERS.items():
+        start = time.perf_counter()
+        df_pandas = build(df_clean).reset_index(drop=True)
+        pandas_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df_duckdb = build(clean_path, backend='duckdb')
+        duckdb_seconds = time.perf_counter() - start
 
-    df_mart_citations = build_mart_citations_year(df_clean)
+        pd.testing.assert_frame_equal(df_pandas, df_duckdb, check_exact=False, rtol=1e-9)
+
+        timings[name] = (pandas_seconds, duckdb_seconds)
+        print(f'{name}: pandas {pandas_seconds:.2f}s, duckdb {duckdb_seconds:.2f}s -> identical')
+
+    return timings
+
+def build_and_validate_marts(df_clean, backend='pandas', dag=False):
+    # every mart is built and validated before any of them is written, so a
+    # failed check leaves the marts on disk as they were
+    if dag:
+        marts = build_marts_dag(df_clean, backend)
+    else:
+        marts = {name: build(df_clean, backend) for name, build in MART_BUILDERS.items()}
+
+    df_mart_citations = marts['mart_citations_year']
     print('mart_citations_year shape:', df_mart_citations.shape)
     print(df_mart_citations.head())
-    validate_mart_citations_year(df_mart_citations)
-    save_mart_citations_year(df_mart_citations, project_root)
+    timings = validate_mart_citations_year(df_mart_citations)
+    print('validated in', format_timings(timings))
 
-    df_mart_citations_year_month = build_mart_citations_year_month(df_clean)
+    df_mart_citations_year_month = marts['mart_citations_year_month']
     print('mart_citations_year_month shape:', df_mart_citations_year_month.shape)
     print(df_mart_citations_year_month.head())
-    validate_mart_citations_year_month(df_mart_citations_year_month)
-    save_mart_citations_year_month(df_mart_citations_year_month, project_root)
+    timings = validate_mart_citations_year_month(df_mart_citations_year_month)
+    print('validated in', format_timings(timings))
 
-    df_mart_state = build_mart_state_year(df_clean)
+    df_mart_state = marts['mart_state_year']
     print('mart_state_year shape:', df_mart_state.shape)
     print(df_mart_state.head())
-    validate_mart_state_year(df_mart_state)
-    save_mart_state_year(df_mart_state, project_root)
+    timings = validate_mart_state_year(df_mart_state)
+    print('validated in', format_timings(timings))
 
-    df_mart_citations_month = build_mart_citations_month(df_clean)
+    df_mart_citations_month = marts['mart_citations_month']
     print('mart_citations_month shape:', df_mart_citations_month.shape)
     print(df_mart_citations_month.head())
-    validate_mart_citations_month(df_mart_citations_month)
-    save_mart_citations_month(df_mart_citations_month, project_root)
+    timings = validate_mart_citations_month(df_mart_citations_month)
+    print('validated in', format_timings(timings))
+
+    df_mart_geo = marts['mart_geo_cell_month']
+    print('mart_geo_cell_month shape:', df_mart_geo.shape)
+    print(df_mart_geo.head())
+    timings = validate_mart_geo_cell_month(df_mart_geo)
+    print('validated in', format_timings(timings))
+
+    return marts
+
+def save_marts(marts, project_root, partitions_only=False):
+    save_mart_citations_year(marts['mart_citations_year'], project_root, partitions_only)
+    save_mart_citations_year_month(marts['mart_citations_year_month'], project_root, partitions_only)
+    save_mart_state_year(marts['mart_state_year'], project_root, partitions_only)
+    save_mart_citations_month(marts['mart_citations_month'], project_root, partitions_only)
+    save_mart_geo_cell_month(marts['mart_geo_cell_month'], project_root, partitions_only)
+
+def main(backend='pandas', dag=False, years=None):
+    check_backend(backend)
+    project_root = Path(__file__).resolve().parents[1]
+
+    # years: rebuild only these year partitions of every mart (the shares are
+    # per year, so a year is always recomputed whole) and leave the others
+    partitions_only = years is not None
+
+    if backend == 'duckdb' and years is None:
+        # DuckDB scans the Parquet dataset itself; nothing is loaded into pandas
+        df_clean = get_clean_path(project_root)
+        print('Clean source:', df_clean)
+    else:
+        # for a few years the Arrow-filtered partitions are small enough to
+        # hand to either backend as a frame
+        df_clean = load_clean_df(project_root, years)
+        print('Clean shape:', df_clean.shape)
+
+    marts = build_and_validate_marts(df_clean, backend, dag)
+    save_marts(marts, project_root, partitions_only)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# 7 characters = 35 bits: cells of about 150 x 120 m at San Francisco's
+# latitude, a city block or two. Shorter prefixes of a geohash are the
+# enclosing coarser cells, so the mart can be rolled up by left(geohash, n)
+GEOHASH_PRECISION = 7
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def bit_counts(precision):
+    # bits alternate longitude / latitude, starting with longitude
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+def quantize(values, low, high, bits):
+    cells = np.floor((values - low) / (high - low) * (1 << bits))
+    return np.clip(cells, 0, (1 << bits) - 1).astype('int64')
+
+def spread_bits(values):
+    # moves bit k of each (up to 32-bit) value to bit 2k, leaving the odd bits
+    # free for the other axis (Morton / Z-order interleaving)
+    x = values.astype('uint64')
+    x = (x | (x << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x3333333333333333)
+    x = (x | (x << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return x
+
+def cell_codes(latitude, longitude, precision=GEOHASH_PRECISION):
+    # the geohash of every point as one integer, -1 where the point is missing
+    # or off the globe; bisecting the ranges bit by bit is the same as
+    # quantizing each axis once and interleaving the bits
+    lat = np.asarray(latitude, dtype='float64')
+    lon = np.asarray(longitude, dtype='float64')
+
+    with np.errstate(invalid='ignore'):
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+    lon_bits, lat_bits = bit_counts(precision)
+    lon_cells = quantize(np.where(valid, lon, 0), -180, 180, lon_bits)
+    lat_cells = quantize(np.where(valid, lat, 0), -90, 90, lat_bits)
+
+    # longitude takes the higher bit of each pair; with an odd bit count it
+    # has one bit more, so latitude is padded by one and the pad dropped
+    pad = lon_bits - lat_bits
+    codes = (spread_bits(lon_cells) << np.uint64(1)) | spread_bits(lat_cells << pad)
+    codes = (codes >> np.uint64(pad)).astype('int64')
+
+    return np.where(valid, codes, -1)
+
+def encode_codes(codes, precision=GEOHASH_PRECISION):
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    digits = (np.asarray(codes, dtype='int64')[:, None] >> shifts) & 31
+
+    # one character per digit, each row viewed as a single fixed-width string
+    chars = np.array(list(BASE32))[digits]
+    return np.ascontiguousarray(chars).view(f'<U{precision}').ravel()
+
+def decode_codes(geohashes):
+    values = np.asarray(geohashes, dtype=str)
+    precision = len(values[0]) if len(values) else GEOHASH_PRECISION
+
+    lookup = np.zeros(128, dtype='int64')
+    lookup[[ord(c) for c in BASE32]] = np.arange(32)
+
+    chars = values.astype(f'<U{precision}').view('<U1').reshape(len(values), precision)
+    digits = lookup[chars.view('int32')]
+
+    codes = np.zeros(len(values), dtype='int64')
+    for k in range(precision):
+        codes = (codes << 5) | digits[:, k]
+
+    return codes, precision
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    # categorical: the text is built once per distinct cell (a few thousand
+    # in the city), not once per citation; missing points get a missing cell
+    codes = cell_codes(latitude, longitude, precision)
+    index = latitude.index if isinstance(latitude, pd.Series) else None
+
+    cells, unique_codes = pd.factorize(codes)
+
+    valid = unique_codes >= 0
+    categories = encode_codes(unique_codes[valid], precision)
+
+    # renumber the cells without the -1 code, which becomes the NaN code
+    remap = np.full(len(unique_codes), -1, dtype='int64')
+    remap[valid] = np.arange(valid.sum())
+
+    return pd.Series(pd.Categorical.from_codes(remap[cells], categories=categories), index=index)
+
+def cell_centers(geohashes):
+    # centre point of each cell, to place the aggregates on a map
+    codes, precision = decode_codes(geohashes)
+    lon_bits, lat_bits = bit_counts(precision)
+    total = lon_bits + lat_bits
+
+    lon_cells = np.zeros(len(codes), dtype='int64')
+    lat_cells = np.zeros(len(codes), dtype='int64')
+
+    for i in range(total):
+        bit = (codes >> (total - 1 - i)) & 1
+        if i % 2 == 0:
+            lon_cells = (lon_cells << 1) | bit
+        else:
+            lat_cells = (lat_cells << 1) | bit
+
+    lat = -90 + (lat_cells + 0.5) * 180 / (1 << lat_bits)
+    lon = -180 + (lon_cells + 0.5) * 360 / (1 << lon_bits)
+
+    return lat, lon
@@ -0,0 +1,151 @@
+import time
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+import build_marts
+from clean import (
+    COLUMN_MAPPING,
+    DATETIME_COL,
+    basic_dg_checks,
+    clean_raw_df,
+    detect_datetime_format,
+    get_clean_dir,
+    parse_timestamps,
+    raw_table_to_df,
+    read_high_water_mark,
+    save_clean_df,
+    save_high_water_mark
+)
+from ingest import BLOCK_SIZE, CSV_PATH, raw_schema, read_header
+from schema import apply_schema
+
+# Daily refresh: only citations issued after the high-water mark are read from
+# the export, cleaned and merged into their year=/month= partitions of the clean
+# dataset; only the years they fall in are rebuilt in every mart, and written
+# together with those partitions once every mart has passed validation.
+# A full ingest -> clean -> mart run remains the way to rebuild from scratch.
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# citations keyed in late (issued before the mark, exported after the last run)
+# are picked up by re-reading this far back; the overlap is deduplicated on
+# citation_id, so re-running a day is harmless
+LOOKBACK = pd.Timedelta(days = 1)
+
+def read_new_rows(csv_path, since, block_size = BLOCK_SIZE):
+    # streamed block by block: a block is kept only for the rows issued after
+    # 'since', so memory follows the size of the delta, not of the export
+    header = read_header(csv_path)
+    columns = [col for col in COLUMN_MAPPING if col in header]
+
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options = pacsv.ReadOptions(block_size = block_size),
+        convert_options = pacsv.ConvertOptions(
+            column_types = raw_schema(header),
+            include_columns = columns,
+            strings_can_be_null = True
+        )
+    )
+
+    since = pa.scalar(pd.Timestamp(since).to_pydatetime(), pa.timestamp('us'))
+    datetime_format = None
+    batches = []
+    rows = 0
+    unparsed = 0
+
+    for batch in reader:
+        rows += batch.num_rows
+        values = batch.column(DATETIME_COL)
+
+        # detected from the first batch holding parseable timestamps; every
+        # row is parsed as clean.py parses it, stragglers in another format
+        # included, so no batch is dropped for a few malformed values
+        if datetime_format is None:
+            datetime_format = detect_datetime_format(values)
+
+        issued = parse_timestamps(values, datetime_format)
+
+        # rows whose timestamp does not parse cannot be placed against the
+        # mark: counted and left to the next full rebuild
+        unparsed += pc.sum(pc.and_(pc.is_valid(values), pc.is_null(issued))).as_py() or 0
+
+        batch = batch.filter(pc.fill_null(pc.greater(issued, since), False))
+
+        if batch.num_rows:
+            batches.append(batch)
+
+    table = pa.Table.from_batches(batches, reader.schema)
+
+    return table, rows, unparsed
+
+def merge_years(df_new, project_root):
+    # the clean data of every year the new rows fall in: the marts are rebuilt
+    # per year, from these rows, before anything is written
+    months = sorted({(int(year), int(month)) for year, month in df_new[['year', 'month']].drop_duplicates().itertuples(index = False)})
+    years = sorted({year for year, _ in months})
+
+    df_years = build_marts.load_clean_df(project_root, years)
+    rewritten = pd.MultiIndex.from_frame(df_years[['year', 'month']].astype('int64')).isin(months)
+
+    # a citation's issue month fixes its partition, so a re-issued citation_id
+    # can only collide with rows of the months being rewritten
+    df_months = apply_schema(pd.concat([df_years[rewritten], df_new], ignore_index = True))
+    df_months = df_months.drop_duplicates('citation_id', keep = 'last')
+
+    df_years = apply_schema(pd.concat([df_years[~rewritten], df_months], ignore_index = True))
+
+    return df_years, df_months, months
+
+def main(backend = 'pandas', dag = False, csv_path = CSV_PATH):
+    build_marts.check_backend(backend)
+    project_root = PROJECT_ROOT
+
+    high_water_mark = read_high_water_mark(project_root)
+    if high_water_mark is None or not get_clean_dir(project_root).exists():
+        raise FileNotFoundError('No clean dataset / high-water mark yet: run ingest, clean and mart first')
+
+    print('High-water mark:', high_water_mark)
+    start = time.perf_counter()
+
+    table, rows, unparsed = read_new_rows(csv_path, high_water_mark - LOOKBACK)
+    print(f'New rows: {table.num_rows:,} of {rows:,} ({time.perf_counter() - start:.1f}s)')
+
+    if unparsed:
+        print(f"Skipped {unparsed:,} row(s) with an unparseable '{DATETIME_COL}': they need a full rebuild")
+
+    if table.num_rows == 0:
+        print('Nothing to append')
+        return
+
+    df_new = clean_raw_df(raw_table_to_df(table))
+    # undated rows have no partition to go to (and no place against the mark)
+    df_new = df_new[df_new['year'].notna()]
+    df_new = df_new.drop_duplicates('citation_id', keep = 'last')
+
+    basic_dg_checks(df_new)
+
+    df_years, df_months, months = merge_years(df_new, project_root)
+    years = sorted({year for year, _ in months})
+    print(f'Merged {len(months)} month(s): {months} ({time.perf_counter() - start:.1f}s)')
+
+    # the marts of those years are built and validated from the merged rows
+    # first: a failed check leaves the clean data, the marts and the mark
+    # exactly as they were
+    marts = build_marts.build_and_validate_marts(df_years, backend, dag)
+
+    save_clean_df(df_months, project_root, partitions_only = True)
+    build_marts.save_marts(marts, project_root, partitions_only = True)
+
+    # advanced only once the clean data and the marts are written: a run
+    # interrupted while writing is repeated from the previous mark, and the
+    # overlap is deduplicated on citation_id
+    save_high_water_mark(project_root, max(high_water_mark, df_new['issued_date_raw'].max()))
+    print(f'Rewrote {len(months)} clean partition(s) and {len(years)} year(s) of every mart')
+    print(f'Incremental refresh done in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    main()
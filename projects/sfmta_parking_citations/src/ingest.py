@@ -1,26 +1,120 @@
-import pandas as pd
+import csv
+import time
 from pathlib import Path
+import psutil
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 RAW_PATH = PROJECT_ROOT / 'data' / 'raw'
 CSV_PATH = RAW_PATH / 'sfmta_parking_citations.csv'
 PARQUET_PATH = RAW_PATH / 'parking_citations_raw.parquet'
 
+# CSV bytes decoded per batch. The reader decodes a bounded number of blocks
+# ahead, so peak memory follows the block size, not the size of the export
+BLOCK_SIZE = 4 << 20
+
+# batches are buffered up to one row group before being written
+ROW_GROUP_SIZE = 250_000
+
+# explicit types instead of per-block inference: ids and timestamps stay text
+# (parsed in clean.py), 'Fine Amount' too since the export may carry '$96.00'.
+# Columns not listed here are read as strings.
+RAW_TYPES = {
+    'Citation Number': pa.string(),
+    'Citation Issued DateTime': pa.string(),
+    'Violation': pa.string(),
+    'Violation Description': pa.string(),
+    'Citation Location': pa.string(),
+    'Vehicle Plate State': pa.string(),
+    'Fine Amount': pa.string(),
+    'Latitude': pa.float64(),
+    'Longitude': pa.float64(),
+}
+
+def read_header(csv_path):
+    # utf-8-sig: an export saved with a byte order mark would otherwise carry it
+    # into the first column name, which then matches no RAW_TYPES entry
+    with csv_path.open('r', newline = '', encoding = 'utf-8-sig') as f:
+        return next(csv.reader(f))
+
+def raw_schema(columns):
+    return pa.schema([(col, RAW_TYPES.get(col, pa.string())) for col in columns])
+
+def convert_csv_to_parquet(
+    csv_path,
+    parquet_path,
+    block_size = BLOCK_SIZE,
+    row_group_size = ROW_GROUP_SIZE
+):
+    schema = raw_schema(read_header(csv_path))
+
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options = pacsv.ReadOptions(block_size = block_size),
+        convert_options = pacsv.ConvertOptions(
+            column_types = schema,
+            strings_can_be_null = True
+        )
+    )
+
+    process = psutil.Process()
+    peak_rss = process.memory_info().rss
+    rows = 0
+    start = time.perf_counter()
+
+    tmp_path = parquet_path.with_suffix('.parquet.tmp')
+
+    with pq.ParquetWriter(tmp_path, schema, compression = 'zstd') as writer:
+        buffered = []
+        buffered_rows = 0
+
+        for batch in reader:
+            buffered.append(batch)
+            buffered_rows += batch.num_rows
+            rows += batch.num_rows
+
+            if buffered_rows >= row_group_size:
+                # full row groups only; the tail is carried into the next one
+                table = pa.Table.from_batches(buffered, schema)
+                full_rows = buffered_rows - buffered_rows % row_group_size
+
+                writer.write_table(table.slice(0, full_rows), row_group_size = row_group_size)
+
+                buffered = table.slice(full_rows).to_batches()
+                buffered_rows -= full_rows
+
+            peak_rss = max(peak_rss, process.memory_info().rss)
+
+        if buffered:
+            writer.write_table(pa.Table.from_batches(buffered, schema), row_group_size = row_group_size)
+
+    tmp_path.replace(parquet_path)
+
+    seconds = time.perf_counter() - start
+
+    return {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else 0.0,
+        'peak_rss_mb': peak_rss / 2 ** 20,
+    }
+
 def main():
 
     if not CSV_PATH.exists():
         raise FileNotFoundError(f'CSV hot founr: {CSV_PATH}')
-    
-    df = pd.read_csv(CSV_PATH)
-
-    print('Rows read:', len(df))
 
     RAW_PATH.mkdir(parents = True, exist_ok = True)
-    df.to_parquet(PARQUET_PATH, index = False)
+    stats = convert_csv_to_parquet(CSV_PATH, PARQUET_PATH)
+
+    print('Rows read:', stats['rows'])
+    print(f"Throughput: {stats['rows_per_second']:,.0f} rows/s ({stats['seconds']:.1f}s), peak RSS {stats['peak_rss_mb']:,.0f} MB")
 
     print('Saved to:', PARQUET_PATH)
 
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
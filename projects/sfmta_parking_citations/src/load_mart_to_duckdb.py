@@ -1,33 +1,40 @@
 from pathlib import Path
-import duckdb
+
+import repo_root  # puts the repo root on sys.path, for utils
+from utils.load_mart_to_duckdb import load_marts
+
+# python src/load_mart_to_duckdb.py: exposes the marts below in the project's
+# DuckDB file through the shared catalog loader
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 MART_DIR = PROJECT_ROOT / 'data' / 'mart'
+DB_PATH = MART_DIR / 'sfmta_parking_citations.duckdb'
 
-paths = {
-    'mart_citations_month': MART_DIR / 'mart_citations_month.parquet',
-    'mart_citations_year_month': MART_DIR / 'mart_citations_year_month.parquet',
-    'mart_citations_year': MART_DIR / 'mart_citations_year.parquet',
-    'mart_state_year': MART_DIR / 'mart_state_year.parquet'
+marts = {
+    'mart_citations_month': {
+        'path': MART_DIR / 'mart_citations_month',
+        'mode': 'view',
+    },
+    'mart_citations_year_month': {
+        'path': MART_DIR / 'mart_citations_year_month',
+        'mode': 'view',
+    },
+    'mart_citations_year': {
+        'path': MART_DIR / 'mart_citations_year',
+        'mode': 'view',
+    },
+    'mart_state_year': {
+        'path': MART_DIR / 'mart_state_year',
+        'mode': 'view',
+    },
+    'mart_geo_cell_month': {
+        'path': MART_DIR / 'mart_geo_cell_month',
+        'mode': 'view',
+    },
 }
 
-print('PROJECT_ROOT:', PROJECT_ROOT)
-print('MART_DIR:', MART_DIR)
-
-for name, path in paths.items():
-    print(f'{name}: {path} -> exists={path.exists()}')
-
-con = duckdb.connect(str(MART_DIR / 'sfmta_parking_citations.duckdb'))
-
-for name, path in paths.items():
-    if not path.exists():
-        raise FileNotFoundError(f'{name}: file not found: {path}')
-    con.execute(f"""
-        create or replace view {name} AS
-        select *
-        from read_parquet('{path.as_posix()}');
-    """)
-    print(f'Created/updated table: {name}')
+def main(force=False, hash_contents=False):
+    load_marts(DB_PATH, marts, force=force, hash_contents=hash_contents)
 
-con.close()
-print('Done.')
\ No newline at end of file
+if __name__ == '__main__':
+    main()
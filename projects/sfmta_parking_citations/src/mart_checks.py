@@ -0,0 +1,115 @@
+import time
+import numpy as np
+
+# A mart spec lists the assertions on one mart; validate_mart() compiles it
+# into one vectorized pass per check kind instead of one scan per column:
+#   grain: key columns, unique together and never null
+#   not_null: other columns that must be present in every row
+#   ranges: {col: (low, high)}, inclusive, None for an open end; nulls are
+#           left to not_null
+#   share_sums: {col: group_col}, shares that must add up to ~1 per group
+#   implied: checks the producing aggregation already guarantees
+#            ('grain_unique', 'grain_not_null'), skipped for freshly built marts
+SHARE_EPS = 1e-6
+SHARE_SUM_TOL = 1e-3
+SHARE_RANGE = (-SHARE_EPS, 1 + SHARE_EPS)
+
+def check_columns(df, spec):
+    expected = list(spec.get('grain', [])) + list(spec.get('not_null', []))
+    expected += list(spec.get('ranges', {})) + list(spec.get('share_sums', {}))
+
+    return [f'Missing expected column: {col}' for col in dict.fromkeys(expected) if col not in df.columns]
+
+def check_grain_unique(df, spec):
+    grain = spec['grain']
+    dups = df.duplicated(subset=grain).sum()
+
+    return [f'Found {dups} duplicates for grain {grain}'] if dups else []
+
+def check_not_null(df, cols):
+    if not cols:
+        return []
+
+    nulls = df[cols].isna().sum()
+
+    return [f'Column {col} contains {n} null values in mart' for col, n in nulls.items() if n]
+
+def check_ranges(df, ranges):
+    messages = []
+
+    # nullable columns are read as plain float arrays (NA -> NaN, which
+    # compares False) and only the bounded ends are compared
+    for col, (low, high) in ranges.items():
+        values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+
+        bad = np.zeros(len(values), dtype=bool)
+        if low is not None:
+            np.less(values, low, out=bad)
+        if high is not None:
+            bad |= values > high
+
+        n = np.count_nonzero(bad)
+        if n:
+            messages.append(f'Found {n} rows with {col} outside [{low}, {high}]')
+
+    return messages
+
+def check_share_sums(df, share_sums):
+    messages = []
+
+    # one groupby per group key, summing all of its share columns together
+    by_key = {}
+    for col, key in share_sums.items():
+        by_key.setdefault(key, []).append(col)
+
+    for key, cols in by_key.items():
+        sums = df.groupby(key, sort=False, observed=True)[cols].sum()
+        off = ((sums - 1.0).abs() >= SHARE_SUM_TOL).sum()
+
+        messages += [f'{col} does not sum to ~1 by {key}' for col, n in off.items() if n]
+
+    return messages
+
+def compile_checks(spec, skip_implied=True):
+    implied = set(spec.get('implied', [])) if skip_implied else set()
+    grain = list(spec.get('grain', []))
+
+    not_null = list(spec.get('not_null', []))
+    if 'grain_not_null' not in implied:
+        not_null = grain + not_null
+
+    checks = [('columns', lambda df: check_columns(df, spec))]
+
+    if grain and 'grain_unique' not in implied:
+        checks.append(('grain_unique', lambda df: check_grain_unique(df, spec)))
+    if not_null:
+        checks.append(('not_null', lambda df: check_not_null(df, not_null)))
+    if spec.get('ranges'):
+        checks.append(('ranges', lambda df: check_ranges(df, spec['ranges'])))
+    if spec.get('share_sums'):
+        checks.append(('share_sums', lambda df: check_share_sums(df, spec['share_sums'])))
+
+    return checks
+
+def validate_mart(df_mart, name, spec, skip_implied=True):
+    # returns {check: seconds}; raises with every failed assertion at once
+    timings = {}
+    failures = []
+
+    for check, run in compile_checks(spec, skip_implied):
+        start = time.perf_counter()
+        messages = run(df_mart)
+        timings[check] = time.perf_counter() - start
+
+        failures += messages
+
+        # the remaining checks index the expected columns
+        if check == 'columns' and messages:
+            break
+
+    assert not failures, f'{name} failed validation: ' + '; '.join(failures)
+
+    return timings
+
+def format_timings(timings):
+    return ', '.join(f'{check} {seconds * 1000:.1f}ms' for check, seconds in timings.items())
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+# imported first by the scripts that use the shared utils package: puts the
+# repo root on sys.path, so utils.<module> imports when a script runs as
+# python src/<script>.py
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
@@ -0,0 +1,58 @@
+import pandas as pd
+import pyarrow as pa
+
+# low-cardinality text (a few hundred violations, ~60 plate states, a few
+# thousand geohash cells, street addresses repeating over millions of rows):
+# one small integer code per row, written as a Parquet dictionary column
+CATEGORICAL_COLS = [
+    'violation_description',
+    'violation_code',
+    'location',
+    'vehicle_state',
+    'geohash',
+]
+
+# declared dtypes of the clean layer. pandas writes them to Parquet as
+# dictionary / int8 / int16 / float / date32 columns and pd.read_parquet
+# restores them as-is. month and year are nullable: a citation whose
+# timestamp could not be parsed keeps a missing date instead of a float NaN
+CLEAN_DTYPES = {
+    'citation_id': 'string',
+    'issued_date_raw': 'datetime64[us]',
+    'violation_description': 'category',
+    'violation_code': 'category',
+    'fine_amount': 'Float64',
+    'location': 'category',
+    'vehicle_state': 'category',
+    # float32 resolves under a metre at San Francisco's coordinates
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'issued_date': pd.ArrowDtype(pa.date32()),
+    'month': 'Int8',
+    'year': 'Int16',
+    'geohash': 'category',
+}
+
+def to_category(s):
+    # sorted categories: groupbys on the codes then come out in text order,
+    # as they did on plain strings
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype('category')
+
+    categories = s.cat.categories
+    if categories.is_monotonic_increasing:
+        return s
+
+    return s.cat.reorder_categories(categories.sort_values())
+
+def apply_schema(df):
+    for col, dtype in CLEAN_DTYPES.items():
+        if col not in df.columns:
+            continue
+
+        if dtype == 'category':
+            df[col] = to_category(df[col])
+        elif df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+
+    return df
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import build_marts
+import clean
+import ingest
+
+import repo_root  # puts the repo root on sys.path, for utils
+from utils.stage_cache import CACHE_MAX_BYTES, code_files, run_stage
+
+# python src/stages.py [ingest] [clean] [mart]: each stage is skipped (or its
+# outputs restored from the cache) when its inputs, code and parameters match
+# an earlier run, so after an edit only that stage and the ones downstream of
+# it recompute. The scripts themselves still always run in full
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = PROJECT_ROOT / 'data' / '.stage_cache'
+MART_DIR = PROJECT_ROOT / 'data' / 'mart'
+
+def define_stages(project_root = PROJECT_ROOT, backend = 'pandas', dag = False):
+    clean_dir = clean.get_clean_dir(project_root)
+
+    return {
+        'ingest': {
+            'func': ingest.main,
+            'inputs': [ingest.CSV_PATH],
+            'outputs': [ingest.PARQUET_PATH],
+            'code': code_files(ingest.__file__),
+        },
+        'clean': {
+            'func': clean.main,
+            'inputs': [ingest.PARQUET_PATH],
+            'outputs': [clean_dir, clean.get_state_path(project_root)],
+            'code': code_files(clean.__file__),
+        },
+        'mart': {
+            'func': build_marts.main,
+            'params': {'backend': backend, 'dag': dag},
+            'inputs': [clean_dir],
+            'outputs': [MART_DIR / name for name in build_marts.MART_BUILDERS],
+            'code': code_files(build_marts.__file__),
+        },
+    }
+
+def main(names = None, max_bytes = CACHE_MAX_BYTES):
+    stages = define_stages()
+
+    unknown = [name for name in names or [] if name not in stages]
+    if unknown:
+        raise ValueError(f'Unknown stage(s) {unknown}, expected some of {list(stages)}')
+
+    # always in pipeline order, whatever order they were asked for in
+    for name, stage in stages.items():
+        if names and name not in names:
+            continue
+
+        run_stage(name, cache_dir = CACHE_DIR, max_bytes = max_bytes, **stage)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
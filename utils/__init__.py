@@ -0,0 +1,3 @@
+# Pipeline modules shared by the projects: imported as utils.<module>, with the
+# repo root put on sys.path by src/__init__.py (Medicare) or src/repo_root.py
+# (SFMTA), so both keep running from their own project directories.
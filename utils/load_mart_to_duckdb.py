@@ -0,0 +1,142 @@
+import hashlib
+import duckdb
+import pyarrow.dataset as ds
+
+# DuckDB catalog loader shared by the projects: each project names its database
+# file and its marts (name -> path, mode, indexes) and passes them to load_marts
+
+# view: query the Parquet dataset in place, nothing is copied into the .duckdb file
+# table: materialize a copy (plus indexes) for repeated point lookups
+# arrow: register an in-memory Arrow table / DataFrame, zero-copy, this connection only
+LOAD_MODES = ('view', 'table', 'arrow')
+
+def parquet_files(path):
+    if path.is_dir():
+        return sorted(path.rglob('*.parquet'))
+
+    return [path]
+
+def fingerprint(path, hash_contents=False):
+    # size + mtime of every file is enough to notice a rewrite; hashing the
+    # contents also survives a copy that resets mtimes, at the cost of a full read
+    digest = hashlib.sha256()
+
+    for file in parquet_files(path):
+        stat = file.stat()
+        digest.update(f'{file.relative_to(path.parent)}:{stat.st_size}'.encode())
+
+        if hash_contents:
+            with file.open('rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        else:
+            digest.update(str(stat.st_mtime_ns).encode())
+
+    return digest.hexdigest()
+
+def parquet_source(path):
+    if path.is_dir():
+        return f"read_parquet('{path.as_posix()}/**/*.parquet', hive_partitioning = true)"
+
+    return f"read_parquet('{path.as_posix()}')"
+
+def ensure_state_table(con):
+    con.execute("""
+        create table if not exists _catalog_state (
+            name varchar primary key,
+            mode varchar,
+            fingerprint varchar,
+            loaded_at timestamp
+        )
+    """)
+
+def relation_type(con, name):
+    row = con.execute("""
+        select 'view' from duckdb_views() where view_name = ? and not temporary and not internal
+        union all
+        select 'table' from duckdb_tables() where table_name = ? and not temporary
+    """, [name, name]).fetchone()
+
+    return row[0] if row else None
+
+def is_unchanged(con, name, mode, source_fingerprint):
+    row = con.execute(
+        'select mode, fingerprint from _catalog_state where name = ?', [name]
+    ).fetchone()
+
+    return relation_type(con, name) == mode and row == (mode, source_fingerprint)
+
+def drop_relation(con, name):
+    # a frame registered under the same name would shadow the persisted mart
+    con.unregister(name)
+
+    # a mart can switch modes between runs, and 'create or replace' cannot
+    # turn a view into a table or the other way round
+    existing = relation_type(con, name)
+
+    if existing is not None:
+        con.execute(f'drop {existing} {name}')
+
+def load_mart(con, name, spec, frame=None, force=False, hash_contents=False):
+    mode = spec.get('mode', 'view')
+
+    if mode not in LOAD_MODES:
+        raise ValueError(f'Unknown load mode {mode!r} for {name}, expected one of {LOAD_MODES}')
+
+    if mode == 'arrow':
+        if frame is None:
+            frame = ds.dataset(spec['path'], format='parquet', partitioning='hive').to_table()
+
+        # a registered frame is a temporary view: it shadows a persisted mart of
+        # the same name for this connection without touching the database file
+        con.register(name, frame)
+        print(f'Registered Arrow table: {name} ({len(frame)} rows)')
+        return True
+
+    path = spec['path']
+    if not path.exists():
+        raise FileNotFoundError(f'{name}: file not found: {path}')
+
+    source_fingerprint = fingerprint(path, hash_contents)
+
+    if not force and is_unchanged(con, name, mode, source_fingerprint):
+        print(f'Unchanged, skipped: {name}')
+        return False
+
+    drop_relation(con, name)
+
+    if mode == 'view':
+        con.execute(f'create view {name} as select * from {parquet_source(path)}')
+    else:
+        con.execute(f'create table {name} as select * from {parquet_source(path)}')
+
+        for col in spec.get('indexes', []):
+            con.execute(f'create index idx_{name}_{col} on {name} ({col})')
+
+    con.execute(
+        'insert or replace into _catalog_state values (?, ?, ?, current_timestamp)',
+        [name, mode, source_fingerprint],
+    )
+
+    print(f'Created/updated {mode}: {name}')
+    return True
+
+def load_catalog(con, specs, frames=None, force=False, hash_contents=False):
+    frames = frames or {}
+    ensure_state_table(con)
+
+    return {
+        name: load_mart(con, name, spec, frames.get(name), force, hash_contents)
+        for name, spec in specs.items()
+    }
+
+def load_marts(db_path, marts, force=False, hash_contents=False):
+    print('DB_PATH:', db_path)
+
+    for name, spec in marts.items():
+        print(f"{name}: {spec['path']} -> exists={spec['path'].exists()}")
+
+    con = duckdb.connect(str(db_path))
+    load_catalog(con, marts, force=force, hash_contents=hash_contents)
+    con.close()
+    print('Done.')
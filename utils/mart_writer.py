@@ -0,0 +1,117 @@
+from __future__ import annotations
+import shutil
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# DuckDB's own row group size: large enough for efficient scans, small enough
+# that min/max statistics on the sort key skip most of a file for point filters
+ROW_GROUP_SIZE = 122_880
+COMPRESSION = 'zstd'
+
+def write_mart(
+    df: pd.DataFrame,
+    path: Path,
+    partition_cols: list[str] | None = None,
+    sort_by: list[str] | None = None,
+    row_group_size: int = ROW_GROUP_SIZE,
+    compression: str = COMPRESSION,
+    partitions_only: bool = False
+) -> Path:
+    partition_cols = partition_cols or []
+    sort_by = sort_by or []
+
+    # clustered on the filter key inside each partition, so row-group min/max
+    # ranges barely overlap and readers can skip them
+    if partition_cols or sort_by:
+        df = df.sort_values(partition_cols + sort_by, kind='stable')
+
+    # a float year (2023.0, from a NaT-tolerant datetime accessor) would name
+    # the partition 'year=2023.0'
+    for col in partition_cols:
+        if pd.api.types.is_float_dtype(df[col]) and df[col].notna().all():
+            df = df.assign(**{col: df[col].astype('int64')})
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    partitioning = None
+    if partition_cols:
+        partitioning = ds.partitioning(
+            pa.schema([table.schema.field(col) for col in partition_cols]),
+            flavor='hive',
+        )
+
+    file_options = ds.ParquetFileFormat().make_write_options(
+        compression=compression,
+        write_statistics=True,
+    )
+
+    # written next to the target and swapped in, so a failed run never leaves
+    # a half-written mart behind
+    tmp_path = path.with_name(path.name + '.tmp')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+    ds.write_dataset(
+        table,
+        tmp_path,
+        format='parquet',
+        partitioning=partitioning,
+        file_options=file_options,
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=min(row_group_size, max(table.num_rows, 1)),
+        basename_template='part-{i}.parquet',
+    )
+
+    if partitions_only and partition_cols and path.is_dir():
+        # incremental update: only the partitions present in df are swapped
+        # in, one leaf directory at a time; the rest of the dataset is kept
+        for leaf in sorted({file.parent for file in tmp_path.rglob('*.parquet')}):
+            target = path / leaf.relative_to(tmp_path)
+
+            if target.exists():
+                shutil.rmtree(target)
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            leaf.rename(target)
+
+        shutil.rmtree(tmp_path)
+        return path
+
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+    tmp_path.rename(path)
+    return path
+
+def read_mart(
+    path: Path,
+    columns: list[str] | None = None,
+    filters=None
+) -> pd.DataFrame:
+    # hive keys come back as int32 / string (not dictionaries as with
+    # pd.read_parquet), widened to the int64 the marts are built with
+    # (Int64 when a __HIVE_DEFAULT_PARTITION__ holds missing keys)
+    dataset = ds.dataset(
+        path,
+        format='parquet',
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=False),
+    )
+
+    df = dataset.to_table(columns=columns, filter=filters).to_pandas()
+
+    for field in dataset.partitioning.schema if dataset.partitioning else []:
+        if field.name in df.columns and pa.types.is_integer(field.type):
+            df[field.name] = df[field.name].astype('Int64' if df[field.name].isna().any() else 'int64')
+
+    # partition keys are appended after the file columns: restore the order
+    # the mart was written in, recorded in the pandas schema metadata
+    pandas_metadata = dataset.schema.pandas_metadata or {}
+    order = [col['name'] for col in pandas_metadata.get('columns', []) if col['name'] in df.columns]
+
+    if len(order) == len(df.columns):
+        df = df[order]
+
+    return df
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+NUMERIC_PATTERN = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+INTEGER_PATTERN = r'^[-+]?\d+$'
+
+# below this share of distinct values in the sample, a column is cleaned once
+# per distinct value and mapped back to the rows instead of row by row
+LOOKUP_MAX_RATIO = 0.2
+LOOKUP_SAMPLE_ROWS = 10_000
+
+def to_arrow_strings(s: pd.Series) -> pa.Array:
+    try:
+        arr = pa.array(s, from_pandas = True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        arr = pa.array(s.astype('string'), from_pandas = True)
+
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+
+    if not pa.types.is_string(arr.type) and not pa.types.is_large_string(arr.type):
+        arr = pc.cast(arr, pa.string())
+
+    return arr
+
+def use_lookup(arr: pa.Array) -> bool:
+    sample = arr.slice(0, LOOKUP_SAMPLE_ROWS)
+    return len(sample) > 0 and pc.count_distinct(sample).as_py() <= LOOKUP_MAX_RATIO * len(sample)
+
+def clean_values(values: pa.Array, strip_pattern: str | None) -> tuple[pa.Array, pa.Array, pa.Array, pa.Array]:
+    text = pc.utf8_trim_whitespace(values)
+
+    if strip_pattern is not None:
+        text = pc.replace_substring_regex(text, strip_pattern, '')
+
+    matched = pc.fill_null(pc.match_substring_regex(text, NUMERIC_PATTERN), False)
+    is_int = pc.fill_null(pc.match_substring_regex(text, INTEGER_PATTERN), False)
+    empty = pc.fill_null(pc.equal(text, ''), False)
+
+    # only validated text is kept, so the casts in to_numbers cannot fail on it
+    numeric_text = pc.if_else(matched, text, pa.scalar(None, text.type))
+
+    return numeric_text, matched, is_int, empty
+
+def to_numbers(numeric_text: pa.Array, as_int: bool) -> pa.Array:
+    if as_int:
+        # whole numbers go straight from text to int64: through float64, the
+        # ones above 2**53 would be rounded. Arrow's integer parser takes no
+        # '+', and validated text has at most one, in front
+        try:
+            return pc.cast(pc.utf8_ltrim(numeric_text, characters = '+'), pa.int64())
+        except pa.ArrowInvalid:
+            # outside the int64 range: float64, as pd.to_numeric falls back to
+            pass
+
+    return pc.cast(numeric_text, pa.float64())
+
+def parse_numeric(
+    s: pd.Series,
+    strip_pattern: str | None = None,
+    empty_as_missing: bool = True,
+    nullable: bool = False
+) -> tuple[pd.Series, np.ndarray]:
+    # returns the coerced column and a mask of the values that are present but
+    # not numbers. Result types follow pd.to_numeric(errors='coerce'): on
+    # object input int64 when every value is a present integer, float64
+    # otherwise; with nullable=True (as for a 'string' column) Int64 when every
+    # parsed value is an integer, Float64 otherwise
+    if pd.api.types.is_numeric_dtype(s):
+        if nullable and not isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+            s = s.astype('Int64' if pd.api.types.is_integer_dtype(s) else 'Float64')
+
+        return s, np.zeros(len(s), dtype = bool)
+
+    arr = to_arrow_strings(s)
+
+    if use_lookup(arr):
+        # low-cardinality columns (fine amounts, flags): regexes and casts run
+        # over the dictionary of distinct values, then one take per result
+        encoded = pc.dictionary_encode(arr)
+        numeric_text, matched, is_int, empty = clean_values(encoded.dictionary, strip_pattern)
+        matched, is_int, empty = (
+            pc.fill_null(pc.take(mask, encoded.indices), False) for mask in (matched, is_int, empty)
+        )
+    else:
+        encoded = None
+        numeric_text, matched, is_int, empty = clean_values(arr, strip_pattern)
+
+    present = pc.is_valid(arr)
+    if empty_as_missing:
+        present = pc.and_(present, pc.invert(empty))
+
+    invalid = pc.and_(present, pc.invert(matched)).to_numpy(zero_copy_only = False)
+    all_int = pc.all(pc.or_(pc.invert(matched), is_int)).as_py() is not False
+
+    # int64 needs every row to hold a number, Int64 only every number to be whole
+    as_int = all_int and (nullable or pc.all(matched).as_py() is not False)
+
+    numbers = to_numbers(numeric_text, as_int)
+    if encoded is not None:
+        numbers = pc.take(numbers, encoded.indices)
+
+    if nullable:
+        dtype = pd.Int64Dtype() if pa.types.is_integer(numbers.type) else pd.Float64Dtype()
+        return pd.Series(numbers.to_pandas(types_mapper = {numbers.type: dtype}.get), index = s.index, name = s.name), invalid
+
+    return pd.Series(numbers.to_numpy(zero_copy_only = False), index = s.index, name = s.name), invalid
@@ -0,0 +1,327 @@
+from __future__ import annotations
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+from collections.abc import Callable
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+# Stage runner with a content-addressed cache. A stage is keyed by the digests
+# of its input files, the source of its module and the local modules it imports,
+# the library versions and its parameters. Its output files are stored once
+# per content digest under objects/, and a key seen before restores them
+# (or leaves them alone when they are already in place) instead of recomputing.
+
+CACHE_FORMAT = 1
+CACHE_MAX_BYTES = 2 << 30
+LIBRARIES = ('duckdb', 'numpy', 'pandas', 'pyarrow')
+
+HASH_CHUNK = 1 << 20
+
+# the shared package this module lives in: its modules count as a stage's code
+# in every project, next to the project's own
+SHARED_DIR = Path(__file__).resolve().parent
+
+def iter_files(path: Path) -> list[Path]:
+    if path.is_file():
+        return [path]
+
+    if path.is_dir():
+        return sorted(p for p in path.rglob('*') if p.is_file())
+
+    return []
+
+class DigestMemo:
+    # digest per file, trusted while its size and mtime are unchanged, so an
+    # unchanged multi-GB input is not rehashed on every run
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries = json.loads(path.read_text()) if path.exists() else {}
+        self.changed = False
+
+    def digest(self, file: Path) -> str:
+        stat = file.stat()
+        key = str(file.resolve())
+        entry = self.entries.get(key)
+
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+
+        h = hashlib.sha256()
+        with file.open('rb') as f:
+            while chunk := f.read(HASH_CHUNK):
+                h.update(chunk)
+
+        self.record(file, h.hexdigest())
+        return self.entries[key][2]
+
+    def record(self, file: Path, digest: str) -> None:
+        stat = file.stat()
+        self.entries[str(file.resolve())] = [stat.st_size, stat.st_mtime_ns, digest]
+        self.changed = True
+
+    def save(self) -> None:
+        if not self.changed:
+            return
+
+        # entries of files that no longer exist would only grow the memo
+        self.entries = {k: v for k, v in self.entries.items() if Path(k).exists()}
+
+        tmp_path = self.path.with_suffix('.json.tmp')
+        tmp_path.write_text(json.dumps(self.entries))
+        tmp_path.replace(self.path)
+        self.changed = False
+
+def fingerprint(paths: list[Path], memo: DigestMemo) -> dict[str, dict[str, str]]:
+    # missing inputs fingerprint as empty: the stage then runs and reports them
+    return {
+        str(path): {p.relative_to(path).as_posix() if p != path else '': memo.digest(p) for p in iter_files(path)}
+        for path in paths
+    }
+
+def local_imports(source_path: Path, roots: list[Path]) -> list[Path]:
+    tree = ast.parse(source_path.read_text(encoding='utf-8'))
+    names = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+
+    files = []
+    for name in names:
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            continue
+
+        # built-in and frozen modules have no file ('built-in' is not a path:
+        # resolved from inside src/ it would look like a local module)
+        if spec is None or not spec.has_location or not spec.origin:
+            continue
+
+        origin = Path(spec.origin).resolve()
+        if any(origin.is_relative_to(root) for root in roots):
+            files.append(origin)
+
+    return files
+
+def code_files(module_file: str | Path) -> list[Path]:
+    # the stage module plus every module of the same project (or of the shared
+    # package) it imports, directly or not: editing any of them invalidates the stage
+    start = Path(module_file).resolve()
+
+    # the directory imports are resolved against: above any package the
+    # module sits in, so 'src.schema' and plain 'schema' both count as local
+    root = start.parent
+    while (root / '__init__.py').exists():
+        root = root.parent
+
+    seen = set()
+    stack = [start]
+
+    while stack:
+        path = stack.pop()
+        if path in seen:
+            continue
+
+        seen.add(path)
+        stack += local_imports(path, [root, SHARED_DIR])
+
+    return sorted(seen)
+
+def code_version(files: list[Path]) -> dict[str, str]:
+    libraries = {}
+    for name in LIBRARIES:
+        try:
+            libraries[name] = version(name)
+        except PackageNotFoundError:
+            libraries[name] = None
+
+    sources = {
+        f'{path.parent.name}/{path.name}': hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in files
+    }
+
+    return {
+        'format': CACHE_FORMAT,
+        'python': sys.version.split()[0],
+        'libraries': libraries,
+        'sources': sources,
+    }
+
+def stage_key(name: str, inputs: dict, code: dict, params: dict) -> str:
+    payload = json.dumps(
+        {'stage': name, 'inputs': inputs, 'code': code, 'params': params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class StageCache:
+    def __init__(self, cache_dir: Path, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.objects_dir = cache_dir / 'objects'
+        self.manifests_dir = cache_dir / 'stages'
+        self.max_bytes = max_bytes
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        self.memo = DigestMemo(cache_dir / 'digests.json')
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def manifest_path(self, key: str) -> Path:
+        return self.manifests_dir / f'{key}.json'
+
+    def load_manifest(self, key: str) -> dict | None:
+        path = self.manifest_path(key)
+        if not path.exists():
+            return None
+
+        manifest = json.loads(path.read_text())
+
+        # a manifest whose objects were evicted or lost is a miss
+        for files in manifest['outputs'].values():
+            if not all(self.object_path(digest).exists() for digest in files.values()):
+                return None
+
+        return manifest
+
+    def store(self, key: str, name: str, outputs: list[Path]) -> dict:
+        manifest = {'stage': name, 'outputs': fingerprint(outputs, self.memo)}
+
+        for path in outputs:
+            for rel, digest in manifest['outputs'][str(path)].items():
+                obj = self.object_path(digest)
+                if obj.exists():
+                    continue
+
+                # copied, not linked: a stage rewriting its output in place
+                # must not be able to change a cached object
+                obj.parent.mkdir(exist_ok=True)
+                tmp_path = obj.with_name(obj.name + '.tmp')
+                shutil.copyfile(path / rel if rel else path, tmp_path)
+                tmp_path.replace(obj)
+
+        tmp_path = self.manifest_path(key).with_suffix('.json.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        tmp_path.replace(self.manifest_path(key))
+
+        return manifest
+
+    def restore(self, manifest: dict) -> list[Path]:
+        restored = []
+
+        for output, files in manifest['outputs'].items():
+            path = Path(output)
+            if fingerprint([path], self.memo)[output] == files:
+                continue
+
+            # rebuilt next to the target and swapped in, as the stages write
+            tmp_path = path.with_name(path.name + '.tmp')
+            if tmp_path.is_dir():
+                shutil.rmtree(tmp_path)
+
+            for rel, digest in files.items():
+                target = tmp_path / rel if rel else tmp_path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(self.object_path(digest), target)
+
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+
+            if files:
+                tmp_path.rename(path)
+
+                for rel, digest in files.items():
+                    self.memo.record(path / rel if rel else path, digest)
+
+            restored.append(path)
+
+        return restored
+
+    def evict(self, keep: str) -> int:
+        # least recently used stage runs go first (a hit touches its manifest)
+        # until the objects still referenced fit in max_bytes
+        manifests = sorted(self.manifests_dir.glob('*.json'), key=lambda p: p.stat().st_mtime_ns)
+
+        referenced = {
+            path: {digest for files in json.loads(path.read_text())['outputs'].values() for digest in files.values()}
+            for path in manifests
+        }
+        sizes = {obj.parent.name + obj.name: obj.stat().st_size for obj in self.objects_dir.glob('*/*')}
+
+        def live_bytes() -> int:
+            return sum(sizes.get(digest, 0) for digest in set().union(*referenced.values()))
+
+        evicted = 0
+        for path in manifests:
+            if live_bytes() <= self.max_bytes:
+                break
+
+            if path.stem == keep:
+                continue
+
+            del referenced[path]
+            path.unlink()
+            evicted += 1
+
+        # objects no manifest points to any more (and stray .tmp copies)
+        live = set().union(*referenced.values())
+        for obj in self.objects_dir.glob('*/*'):
+            if obj.parent.name + obj.name not in live:
+                obj.unlink()
+
+        return evicted
+
+def run_stage(
+    name: str,
+    func: Callable[..., object],
+    inputs: list[Path],
+    outputs: list[Path],
+    code: list[Path],
+    cache_dir: Path,
+    params: dict | None = None,
+    max_bytes: int = CACHE_MAX_BYTES
+) -> bool:
+    # returns True when the stage ran, False when the cache served it
+    params = params or {}
+    cache = StageCache(cache_dir, max_bytes)
+
+    try:
+        key = stage_key(name, fingerprint(inputs, cache.memo), code_version(code), params)
+        manifest = cache.load_manifest(key)
+
+        if manifest is not None:
+            restored = cache.restore(manifest)
+            os.utime(cache.manifest_path(key))
+
+            if restored:
+                print(f'[{name}] cached: restored {", ".join(p.name for p in restored)}')
+            else:
+                print(f'[{name}] cached: outputs up to date')
+
+            return False
+
+        print(f'[{name}] running')
+        func(**params)
+
+        cache.store(key, name, outputs)
+        evicted = cache.evict(keep=key)
+
+        if evicted:
+            print(f'[{name}] evicted {evicted} cached run(s) over {cache.max_bytes / 2 ** 20:,.0f} MB')
+
+        return True
+
+    finally:
+        cache.memo.save()